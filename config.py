@@ -2,3 +2,6 @@ import os
 
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY", "sk-")
 OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL", "https")
+
+# EasyOCR默认使用CPU（避免CUDA问题）；设置 OCR_USE_GPU=1 在可用的NVIDIA GPU上以FP16推理
+OCR_USE_GPU = os.getenv("OCR_USE_GPU", "0") == "1"
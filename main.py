@@ -17,6 +17,7 @@ from PIL import Image
 import threading
 import json
 import re
+import functools
 
 # 配置日志
 logging.basicConfig(
@@ -30,6 +31,44 @@ logging.basicConfig(
 
 logger = logging.getLogger(__name__)
 
+# 文本标准化保留字符位图（BMP内按码点索引）：字母、数字、下划线及中文，与 [\w\u4e00-\u9fff] 等价
+_NORMALIZE_KEEP = bytearray(0x10000)
+for _cp in range(0x10000):
+    _ch = chr(_cp)
+    if _ch.isalnum() or _ch == '_' or 0x4e00 <= _cp <= 0x9fff:
+        _NORMALIZE_KEEP[_cp] = 1
+del _cp, _ch
+
+
+@functools.lru_cache(maxsize=256)
+def normalize_text(text: str) -> str:
+    """标准化文本：去除空白、标点、特殊字符，转小写（静态画面下OCR文本高度重复，结果缓存）"""
+    # 只保留字母、数字、中文字符（位图查表，BMP以外字符回退到isalnum）
+    keep = _NORMALIZE_KEEP
+    return ''.join([
+        c for c in text.lower()
+        if (keep[ord(c)] if ord(c) < 0x10000 else c.isalnum())
+    ])
+
+# 进程名匹配（忽略大小写，避免逐个进程生成小写副本）
+_CURSOR_RE = re.compile('cursor', re.IGNORECASE)
+
+# 对话轮次与关键信息检测关键词：预先小写并合并为单个正则，一次扫描代替逐词子串查找
+_USER_INDICATORS = ("请", "帮我", "实现", "修复", "优化", "添加", "创建", "please", "help", "implement", "fix", "optimize", "add", "create")
+_COMPLETION_INDICATORS = ("完成", "结束", "done", "finished", "completed", "ready", "实现完毕")
+_KEY_POINT_KEYWORDS = ("重要", "注意", "提醒", "建议", "问题", "错误", "关键", "核心",
+                       "主要", "特别", "务必", "必须", "需要", "应该")
+
+
+def _keyword_regex(keywords) -> re.Pattern:
+    """将关键词列表编译为子串匹配的合并正则（与 any(k in text) 语义一致）"""
+    return re.compile('|'.join(re.escape(k.lower()) for k in keywords))
+
+
+_USER_INDICATOR_RE = _keyword_regex(_USER_INDICATORS)
+_COMPLETION_INDICATOR_RE = _keyword_regex(_COMPLETION_INDICATORS)
+_KEY_POINT_KEYWORD_RE = _keyword_regex(_KEY_POINT_KEYWORDS)
+
 # 导入自定义模块
 try:
     from modules.screen_monitor import ScreenMonitor
@@ -77,10 +116,13 @@ class CursorSupervisor:
         # 新增：智能交互状态管理
         self.cursor_is_processing = False  # CURSOR是否正在处理错误
         self.last_dialog_content = ""  # 上次对话内容
+        self._last_dialog_hash = None  # 上次对话内容标准化后的哈希指纹
         self.dialog_history = []  # 对话历史记录
         self.conversation_turns = []  # 完整对话轮次记录
         self.current_turn = None  # 当前对话轮次
         self.last_content_change_time = time.time()  # 上次内容变化时间
+        self._content_changed_event = asyncio.Event()  # 内容真实变化信号，用于提前结束重复内容暂停
+        self.repeated_pause_streak = 0  # 连续重复内容暂停次数（自适应退避）
         self.processing_keywords = [
             "正在处理", "修复中", "分析中", "生成中", "处理错误",
             "working on", "fixing", "analyzing", "generating", "processing"
@@ -89,6 +131,13 @@ class CursorSupervisor:
             "review changes", "审查变更", "检查修改", "查看变更",
             "Review Changes", "review the changes", "请审查"
         ]
+        # 用户反馈关键词 -> 反馈类型（按插入顺序优先匹配）
+        self.feedback_keywords = {
+            "有帮助": "正向",
+            "无帮助": "负向",
+            "建议": "建议",
+            "补充": "补充"
+        }
 
         # 新增：重复处理防护机制
         self.is_processing_message = False  # 当前是否正在处理消息
@@ -202,9 +251,11 @@ class CursorSupervisor:
             import psutil
             windows = []
             
-            for proc in psutil.process_iter(['pid', 'name', 'cmdline']):
+            # 只预取pid和name，cmdline需逐个打开进程句柄且此处未使用
+            for proc in psutil.process_iter(['pid', 'name']):
                 try:
-                    if proc.info['name'] and 'cursor' in proc.info['name'].lower():
+                    name = proc.info['name']
+                    if name and _CURSOR_RE.search(name):
                         windows.append((f"CURSOR (PID: {proc.info['pid']})", (100, 100, 1200, 800)))
                 except (psutil.NoSuchProcess, psutil.AccessDenied):
                     continue
@@ -739,13 +790,16 @@ class CursorSupervisor:
     async def wait_until_cursor_idle(self, timeout: int = 30, interval: float = 2.0):
         """在发送指令前等待CURSOR输出完成"""
         try:
-            start = time.time()
+            deadline = time.monotonic() + timeout
             previous_text = self.last_dialog_content
-            while time.time() - start < timeout:
+            retry_delay = 0.1  # 截图失败时指数退避重试，上限为interval
+            while time.monotonic() < deadline:
                 screenshot = await self.screen_monitor.capture_screenshot()
                 if not screenshot:
-                    await asyncio.sleep(interval)
+                    await asyncio.sleep(retry_delay)
+                    retry_delay = min(retry_delay * 2, interval)
                     continue
+                retry_delay = 0.1
                 current_text = await self.intelligent_monitor.extract_text_from_screenshot(screenshot)
                 similarity = self.calculate_content_similarity(current_text, previous_text)
                 if similarity < 0.9 and len(current_text.strip()) > 0:
@@ -809,7 +863,8 @@ class CursorSupervisor:
             
             screenshot = await self.screen_monitor.capture_screenshot()
             if screenshot:
-                suggestion = self.gpt_controller.suggest_continuation(screenshot, stuck_duration)
+                screen_text = await self.intelligent_monitor.extract_text_from_screenshot(screenshot)
+                suggestion = await self.gpt_controller.suggest_continuation(screenshot, stuck_duration, screen_text or "")
                 
                 if suggestion.get("action"):
                     await self.automation_controller.execute_action(suggestion)
@@ -833,7 +888,7 @@ class CursorSupervisor:
             if review_result.get('quality_score', 0) < 0.8:
                 logger.info("🔍 质量分数较低，请求GPT深度分析...")
                 try:
-                    gpt_analysis = self.gpt_controller.analyze_completed_task(
+                    gpt_analysis = await self.gpt_controller.analyze_completed_task(
                         screenshot, completed_text, "监控检测到的完成内容"
                     )
                     
@@ -937,6 +992,9 @@ class CursorSupervisor:
             if self.intelligent_monitor:
                 await self.intelligent_monitor.cleanup()
             
+            if self.gpt_controller:
+                await self.gpt_controller.cleanup()
+            
             logger.info("✅ 系统清理完成")
             
         except Exception as e:
@@ -1273,10 +1331,7 @@ class CursorSupervisor:
                 if any(marker in line for marker in ["1.", "2.", "3.", "-", "*", "•", "①", "②", "③"]):
                     analysis["key_points"].append(line[:150])
                 # 包含重要关键词的行
-                elif any(keyword in line.lower() for keyword in [
-                    "重要", "注意", "提醒", "建议", "问题", "错误", "关键", "核心", 
-                    "主要", "特别", "务必", "必须", "需要", "应该"
-                ]):
+                elif _KEY_POINT_KEYWORD_RE.search(line.lower()):
                     analysis["key_points"].append(line[:150])
                 # 包含代码或技术细节的行
                 elif any(keyword in line for keyword in ["def ", "class ", "import ", "function", "method"]):
@@ -1317,6 +1372,8 @@ class CursorSupervisor:
         if current_text != self.last_dialog_content:
             # 内容发生了变化
             self.last_content_change_time = time.time()
+            self.repeated_pause_streak = 0
+            self._content_changed_event.set()
             
             # 保存到历史记录
             timestamp = time.strftime("%H:%M:%S")
@@ -1334,6 +1391,7 @@ class CursorSupervisor:
             self.manage_conversation_turns(current_text, timestamp)
             
             self.last_dialog_content = current_text
+            self._last_dialog_hash = hash(normalize_text(current_text))
             logger.debug(f"📝 更新对话历史，当前记录数: {len(self.dialog_history)}")
         else:
             logger.debug("📋 内容无变化，不更新历史记录")
@@ -1487,12 +1545,11 @@ class CursorSupervisor:
         """管理完整的对话轮次"""
         try:
             # 检测是否是新的用户指令（通常包含明确的请求词汇）
-            user_indicators = ["请", "帮我", "实现", "修复", "优化", "添加", "创建", "please", "help", "implement", "fix", "optimize", "add", "create"]
-            is_user_input = any(indicator in current_text.lower() for indicator in user_indicators)
+            text_lower = current_text.lower()
+            is_user_input = _USER_INDICATOR_RE.search(text_lower) is not None
             
             # 检测是否是CURSOR的回复结束（包含完成、结束等标识）
-            completion_indicators = ["完成", "结束", "done", "finished", "completed", "ready", "实现完毕"]
-            is_cursor_completion = any(indicator in current_text.lower() for indicator in completion_indicators)
+            is_cursor_completion = _COMPLETION_INDICATOR_RE.search(text_lower) is not None
             
             if is_user_input and not self.cursor_is_processing:
                 # 开始新的对话轮次
@@ -1592,7 +1649,7 @@ CURSOR回复摘要: {content_analysis['raw_content']}
             current_stage = self.analyze_current_development_stage(cursor_reply, conversation_context)
             
             # 调用GPT-4O产品经理分析，传入详细的分析结果
-            pm_reply = self.gpt_controller.analyze_as_product_manager(
+            pm_reply = await self.gpt_controller.analyze_as_product_manager(
                 screenshot=screenshot,
                 cursor_reply=f"{analysis_context}\n\n原始回复内容:\n{cursor_reply}",
                 project_context=project_context,
@@ -1706,7 +1763,7 @@ CURSOR回复摘要: {content_analysis['raw_content']}
                 current_stage = self.analyze_current_development_stage(cursor_reply, conversation_context)
             
             # 调用GPT-4O产品经理分析，传入项目规划器的上下文
-            pm_reply = self.gpt_controller.analyze_as_product_manager(
+            pm_reply = await self.gpt_controller.analyze_as_product_manager(
                 screenshot=screenshot,
                 cursor_reply=cursor_reply,
                 project_context=project_context,
@@ -2205,17 +2262,10 @@ CURSOR回复摘要: {content_analysis['raw_content']}
 
     def collect_user_feedback(self, user: str, content: str):
         """收集用户反馈，自动识别反馈类型并存储"""
-        feedback_keywords = [
-            ("有帮助", "正向"),
-            ("无帮助", "负向"),
-            ("建议", "建议"),
-            ("补充", "补充")
-        ]
-        feedback_type = "其他"
-        for kw, ftype in feedback_keywords:
-            if kw in content:
-                feedback_type = ftype
-                break
+        feedback_type = next(
+            (ftype for kw, ftype in self.feedback_keywords.items() if kw in content),
+            "其他"
+        )
         self.user_feedback_manager.add_feedback(user, content, feedback_type)
 
     def get_feedback_report(self):
@@ -2227,45 +2277,61 @@ CURSOR回复摘要: {content_analysis['raw_content']}
 
     def is_substantially_same_content(self, current_text: str) -> bool:
         """检测内容是否实质相同 - 处理OCR微小差异导致的重复"""
-        try:
-            if not current_text or not self.last_dialog_content:
-                return False
-            
-            # 标准化文本：去除空白、标点、特殊字符，转小写
-            def normalize_text(text):
-                import re
-                # 只保留字母、数字、中文字符
-                normalized = re.sub(r'[^\w\u4e00-\u9fff]', '', text.lower())
-                return normalized
-            
-            normalized_current = normalize_text(current_text)
-            normalized_last = normalize_text(self.last_dialog_content)
-            
-            # 如果标准化后的文本完全相同
-            if normalized_current == normalized_last:
-                logger.debug("🎯 检测到标准化后文本完全相同")
-                return True
-            
-            # 计算相似度
-            similarity = self.calculate_content_similarity(normalized_current, normalized_last)
-            
-            # 如果相似度超过90%，认为是实质相同
-            if similarity > 0.9:
-                logger.debug(f"🎯 检测到高相似度内容: {similarity:.2%}")
-                return True
-            
-            # 检查是否为相同内容的子集或超集
-            min_len = min(len(normalized_current), len(normalized_last))
-            if min_len > 50:  # 只对足够长的文本进行子集检测
-                if normalized_current in normalized_last or normalized_last in normalized_current:
-                    logger.debug("🎯 检测到内容包含关系")
-                    return True
-            
-            return False
-            
-        except Exception as e:
-            logger.error(f"❌ 检测实质相同内容时出错: {e}")
+        last_content = self.last_dialog_content
+        if not current_text or not last_content:
             return False
+        debug = logger.debug
+        
+        # 标准化文本：去除空白、标点、特殊字符，转小写
+        normalized_current = normalize_text(current_text)
+        
+        # 哈希指纹快速判定：标准化后的文本完全相同
+        if hash(normalized_current) == self._last_dialog_hash:
+            debug("🎯 检测到标准化后文本完全相同")
+            return True
+        
+        normalized_last = normalize_text(last_content)
+        
+        # 计算相似度
+        similarity = self.calculate_content_similarity(normalized_current, normalized_last)
+        
+        # 如果相似度超过90%，认为是实质相同
+        if similarity > 0.9:
+            debug(f"🎯 检测到高相似度内容: {similarity:.2%}")
+            return True
+        
+        # 检查是否为相同内容的子集或超集
+        min_len = min(len(normalized_current), len(normalized_last))
+        if min_len > 50:  # 只对足够长的文本进行子集检测
+            if normalized_current in normalized_last or normalized_last in normalized_current:
+                debug("🎯 检测到内容包含关系")
+                return True
+        
+        return False
+    
+    async def _watch_for_content_change(self, baseline_text: str, interval: float = 3.0):
+        """重复内容暂停期间定期截屏，画面缩略图变化后才做OCR，文本与暂停前实质不同时发出内容变化信号"""
+        baseline = normalize_text(baseline_text)
+        last_thumb = None
+        while not self._content_changed_event.is_set():
+            await asyncio.sleep(interval)
+            try:
+                screenshot = await self.screen_monitor.capture_screenshot()
+                if not screenshot:
+                    continue
+                # 32x32灰度缩略图比对，画面未变时跳过整屏OCR
+                thumb = hash(screenshot.convert('L').resize((32, 32)).tobytes())
+                if thumb == last_thumb:
+                    continue
+                last_thumb = thumb
+                text = await self.intelligent_monitor.extract_text_from_screenshot(screenshot)
+                if not self.is_valid_content(text):
+                    continue
+                # 与暂停前文本的标准化相似度不超过90%才算真正变化，忽略OCR抖动
+                if self.calculate_content_similarity(normalize_text(text), baseline) <= 0.9:
+                    self._content_changed_event.set()
+            except Exception as e:
+                logger.debug(f"暂停期间检查内容变化失败: {e}")
     
     async def handle_repeated_content(self, current_text: str):
         """处理重复内容 - 增加计数器并在超过阈值时暂停监控"""
@@ -2280,15 +2346,24 @@ CURSOR回复摘要: {content_analysis['raw_content']}
             
             logger.warning(f"🔁 检测到重复内容 #{self.repeated_content_count}")
             
-            # 如果重复超过5次，暂停监控30秒
+            # 如果重复超过5次，暂停监控（自适应退避：10秒、20秒，最长30秒）
             if self.repeated_content_count >= 5:
-                pause_duration = 30
+                pause_duration = min(10 * (2 ** self.repeated_pause_streak), 30)
+                self.repeated_pause_streak += 1
                 logger.warning(f"⏸️ 重复内容超过阈值，暂停监控 {pause_duration} 秒")
                 logger.info(f"📝 重复内容预览: {current_text[:100]}...")
                 
-                # 暂停监控
-                import asyncio
-                await asyncio.sleep(pause_duration)
+                # 暂停监控，期间由轻量检查任务截屏识别，内容真实变化时提前恢复
+                self._content_changed_event.clear()
+                watcher = asyncio.create_task(self._watch_for_content_change(current_text))
+                try:
+                    await asyncio.wait_for(self._content_changed_event.wait(), timeout=pause_duration)
+                    logger.info("🔔 检测到内容变化，提前结束暂停")
+                except asyncio.TimeoutError:
+                    pass
+                finally:
+                    watcher.cancel()
+                    self._content_changed_event.clear()
                 
                 # 重置计数器
                 self.repeated_content_count = 0
@@ -2320,4 +2395,13 @@ async def main():
         logger.info("👋 CURSOR监督系统已退出")
 
 if __name__ == "__main__":
+    # 非Windows平台优先使用uvloop事件循环（Windows保留默认的ProactorEventLoop）
+    if platform.system() != "Windows":
+        try:
+            import uvloop
+            asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+            logger.info("✅ 使用uvloop事件循环")
+        except ImportError:
+            pass
+    
     asyncio.run(main()) 
\ No newline at end of file
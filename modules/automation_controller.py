@@ -6,31 +6,258 @@
 """
 
 import asyncio
+import concurrent.futures
+import functools
 import time
 import logging
+import json
+import os
+import re
+import glob
+import platform
 import pyautogui
-from typing import Dict, List, Optional, Tuple, Any
-from PIL import Image
+from typing import Dict, List, Optional, Tuple, Any, Callable, Awaitable, AsyncIterator
+from collections import deque, Counter, defaultdict
 import cv2
 import numpy as np
 
+# 尝试导入MSS截屏库（零拷贝截屏，不可用时回退到pyautogui）
+MSS_AVAILABLE = False
+
+try:
+    import mss
+    MSS_AVAILABLE = True
+except ImportError:
+    pass
+
 logger = logging.getLogger(__name__)
 
+_IS_WINDOWS = platform.system() == "Windows"
+
+_SCREEN_SIZE_TTL = 60.0  # 秒，过期后重新查询，分辨率变化最多延迟一个周期生效
+
+@functools.lru_cache(maxsize=1)
+def _screen_size_at(bucket: int) -> Tuple[int, int]:
+    """按时间分桶缓存屏幕尺寸，bucket变化即重新查询"""
+    width, height = pyautogui.size()
+    return int(width), int(height)
+
+def _screen_size() -> Tuple[int, int]:
+    """屏幕尺寸（缓存60秒，分辨率变化后也可调用 AutomationController.invalidate_screen_cache 立即刷新）"""
+    return _screen_size_at(int(time.monotonic() // _SCREEN_SIZE_TTL))
+
+@functools.lru_cache(maxsize=256)
+def _parse_keys(key_value: str) -> Tuple[str, ...]:
+    """解析按键字符串（如"Ctrl+Shift+P"）为小写按键序列，重复出现的按键直接复用解析结果"""
+    return tuple(key.strip().lower() for key in key_value.split('+'))
+
+async def _pg(fn: Callable[..., Any], *args, **kwargs) -> Any:
+    """在线程中执行阻塞的pyautogui/窗口API调用，避免阻塞事件循环"""
+    return await asyncio.to_thread(fn, *args, **kwargs)
+
+# Windows下查找PowerShell或CMD窗口的标题
+_TERMINAL_TITLES = (
+    "Windows PowerShell",
+    "powershell",
+    "Command Prompt",
+    "cmd",
+    "Terminal",
+    "Git Bash"
+)
+
+# 在CURSOR中打开终端的常见快捷键
+_TERMINAL_SHORTCUTS = (
+    ('ctrl', 'shift', 'grave'),  # Ctrl+Shift+` (常见的终端快捷键)
+    ('ctrl', 'grave'),           # Ctrl+`
+    ('ctrl', 'shift', 't'),      # Ctrl+Shift+T
+    ('f1',),                     # F1可能触发帮助或命令面板
+)
+
+# Windows下通过一次SendInput调用批量发送键盘事件
+if _IS_WINDOWS:
+    import ctypes
+    from ctypes import wintypes
+    
+    _INPUT_KEYBOARD = 1
+    _KEYEVENTF_KEYUP = 0x0002
+    _KEYEVENTF_UNICODE = 0x0004
+    
+    class _KEYBDINPUT(ctypes.Structure):
+        _fields_ = [("wVk", wintypes.WORD), ("wScan", wintypes.WORD), ("dwFlags", wintypes.DWORD),
+                    ("time", wintypes.DWORD), ("dwExtraInfo", ctypes.c_size_t)]
+    
+    class _MOUSEINPUT(ctypes.Structure):
+        _fields_ = [("dx", wintypes.LONG), ("dy", wintypes.LONG), ("mouseData", wintypes.DWORD),
+                    ("dwFlags", wintypes.DWORD), ("time", wintypes.DWORD), ("dwExtraInfo", ctypes.c_size_t)]
+    
+    class _HARDWAREINPUT(ctypes.Structure):
+        _fields_ = [("uMsg", wintypes.DWORD), ("wParamL", wintypes.WORD), ("wParamH", wintypes.WORD)]
+    
+    class _INPUTUNION(ctypes.Union):
+        _fields_ = [("ki", _KEYBDINPUT), ("mi", _MOUSEINPUT), ("hi", _HARDWAREINPUT)]
+    
+    class _INPUT(ctypes.Structure):
+        _fields_ = [("type", wintypes.DWORD), ("union", _INPUTUNION)]
+    
+    _user32 = ctypes.WinDLL("user32", use_last_error=True)
+    _user32.SendInput.argtypes = (wintypes.UINT, ctypes.POINTER(_INPUT), ctypes.c_int)
+    _user32.SendInput.restype = wintypes.UINT
+    
+    def _key_input(vk: int, scan: int, flags: int) -> "_INPUT":
+        return _INPUT(type=_INPUT_KEYBOARD, union=_INPUTUNION(ki=_KEYBDINPUT(vk, scan, flags, 0, 0)))
+    
+    def _send_input_array(array) -> bool:
+        """一次SendInput调用发送已构建好的事件数组"""
+        return _user32.SendInput(len(array), array, ctypes.sizeof(_INPUT)) == len(array)
+    
+    def _send_inputs(inputs: List["_INPUT"]) -> bool:
+        """一次SendInput调用发送所有事件"""
+        return _send_input_array((_INPUT * len(inputs))(*inputs))
+    
+    def _send_text_batched(text: str) -> bool:
+        """以Unicode键盘事件批量输入文本（不经过剪贴板，不逐字符等待）"""
+        units = text.encode("utf-16-le")
+        inputs = []
+        for i in range(0, len(units), 2):
+            code = int.from_bytes(units[i:i + 2], "little")
+            inputs.append(_key_input(0, code, _KEYEVENTF_UNICODE))
+            inputs.append(_key_input(0, code, _KEYEVENTF_UNICODE | _KEYEVENTF_KEYUP))
+        return _send_inputs(inputs) if inputs else True
+    
+    # 终端输入准备按键序列：esc，ctrl+c，ctrl+a，delete（构建一次，重复发送）
+    _VK_ESCAPE, _VK_CONTROL, _VK_DELETE = 0x1B, 0x11, 0x2E
+    _VK_A, _VK_C = 0x41, 0x43
+    _KEYEVENTF_EXTENDEDKEY = 0x0001
+    _PREP_INPUTS = (_INPUT * 10)(
+        _key_input(_VK_ESCAPE, 0, 0), _key_input(_VK_ESCAPE, 0, _KEYEVENTF_KEYUP),
+        _key_input(_VK_CONTROL, 0, 0),
+        _key_input(_VK_C, 0, 0), _key_input(_VK_C, 0, _KEYEVENTF_KEYUP),
+        _key_input(_VK_A, 0, 0), _key_input(_VK_A, 0, _KEYEVENTF_KEYUP),
+        _key_input(_VK_CONTROL, 0, _KEYEVENTF_KEYUP),
+        _key_input(_VK_DELETE, 0, _KEYEVENTF_EXTENDEDKEY),
+        _key_input(_VK_DELETE, 0, _KEYEVENTF_EXTENDEDKEY | _KEYEVENTF_KEYUP),
+    )
+    
+    # 独立终端窗口的类名（控制台、Windows Terminal）
+    _TERMINAL_CLASS_NAMES = frozenset((
+        "ConsoleWindowClass",
+        "CASCADIA_HOSTING_WINDOW_CLASS",
+        "Windows.UI.Input.InputSite.WindowClass",
+    ))
+    
+    _user32.GetForegroundWindow.restype = wintypes.HWND
+    _user32.GetClassNameW.argtypes = (wintypes.HWND, wintypes.LPWSTR, ctypes.c_int)
+    
+    def _foreground_class_name() -> str:
+        """当前前台窗口的类名"""
+        hwnd = _user32.GetForegroundWindow()
+        if not hwnd:
+            return ""
+        buf = ctypes.create_unicode_buffer(256)
+        _user32.GetClassNameW(hwnd, buf, 256)
+        return buf.value
+
+# 命令模式的特征：常见命令前缀、脚本文件后缀、常见的命令关键词（按单词匹配）
+_COMMAND_KEYWORDS = (
+    'pip', 'python', 'npm', 'node', 'git', 'cd', 'ls', 'dir',
+    'mkdir', 'rmdir', 'rm', 'cp', 'mv', 'cat', 'echo', 'curl',
+    'wget', 'chmod', 'chown', 'sudo', 'apt', 'yum', 'brew',
+    'docker', 'kubectl', 'terraform', 'ansible'
+)
+_COMMAND_RE = re.compile(
+    r'^\./|\.(?:py|js|sh)$|(?<![A-Za-z0-9_])(?:' + '|'.join(_COMMAND_KEYWORDS) + r')(?![A-Za-z0-9_])',
+    re.IGNORECASE
+)
+
+# 按钮模板目录（相对项目根目录，不依赖启动时的工作目录）
+_BUTTON_TEMPLATE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "assets", "buttons")
+
 class AutomationController:
     """自动化控制器类"""
     
     def __init__(self):
-        # 配置pyautogui
+        # 配置pyautogui（需要等待的地方显式asyncio.sleep，不依赖全局PAUSE）
         pyautogui.FAILSAFE = True
-        pyautogui.PAUSE = 0.5
+        pyautogui.PAUSE = 0
         
         self.last_action_time = 0
-        self.action_history = []
         self.max_history_length = 50
+        self.action_history = deque(maxlen=self.max_history_length)
+        
+        # 最近5分钟操作统计（增量维护）
+        self._recent_actions = deque()  # (时间戳, 操作类型)
+        self._recent_type_counts = Counter()
+        
+        # 最近10秒按类型的操作时间戳（安全检查频率限制用）
+        self._recent_by_type: Dict[str, deque] = defaultdict(deque)
         
         # 安全检查配置
         self.safe_mode = True
-        self.confirmation_required = ["delete", "remove", "clear", "reset"]
+        self.verify_paste = False  # 调试用：粘贴后回读输入框内容验证
+        self.preserve_clipboard = False  # 粘贴后是否恢复用户原有的剪贴板内容
+        self.confirmation_required = frozenset(["delete", "remove", "clear", "reset"])
+        dangerous_keywords = ["delete", "remove", "clear", "reset", "format", "destroy"]
+        self._danger_re = re.compile("|".join(map(re.escape, dangerous_keywords)), re.IGNORECASE)
+        
+        # 截屏器（在图像处理线程中惰性创建，保证始终在同一线程使用）
+        self._sct = None
+        
+        self._frame_cache: Optional[Tuple[float, np.ndarray]] = None  # (截屏时间, 屏幕帧)
+        
+        # 截屏和OpenCV处理放到单独的单线程池，避免阻塞事件循环
+        self._cv_pool = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+        
+        # 区域配置缓存：路径 -> (修改时间, 配置内容)
+        self._cfg_cache: Dict[str, Tuple[float, Dict[str, Any]]] = {}
+        self._config_positions_cache = None  # (配置修改时间元组, 推算的输入框位置)
+        self._last_input_pos: Optional[Tuple[int, int]] = None  # 上次成功点击的输入框位置
+        
+        # 常见的UI元素关键词映射，及对应的按钮模板
+        self.target_keywords = {
+            "continue": ["continue", "继续", "next", "下一步"],
+            "ok": ["ok", "确定", "confirm", "确认"],
+            "cancel": ["cancel", "取消", "close", "关闭"],
+            "yes": ["yes", "是", "确定"],
+            "no": ["no", "否", "取消"],
+            "run": ["run", "运行", "execute", "执行"],
+            "stop": ["stop", "停止", "halt"],
+            "save": ["save", "保存"],
+            "input": ["input", "输入框", "text", "field"]
+        }
+        # 每个按钮的关键词按单词匹配（避免"no"命中"note"、"ok"命中"token"）
+        self._target_keyword_res = {
+            name: re.compile(r'(?<![A-Za-z0-9_])(?:' + '|'.join(map(re.escape, keywords)) + r')(?![A-Za-z0-9_])')
+            for name, keywords in self.target_keywords.items()
+        }
+        self._templates = self._load_button_templates()
+        self._match_bufs: Dict[Tuple[str, int], np.ndarray] = {}
+        
+        # 图像检测复用缓冲区（灰度图、缩小一级的灰度图、边缘图）
+        self._gray_buf: Optional[np.ndarray] = None
+        self._small_buf: Optional[np.ndarray] = None
+        self._edges_buf: Optional[np.ndarray] = None
+        
+        self._terminal_positions: Optional[List[Tuple[int, int]]] = None  # 终端区域候选点击位置
+        self._terminal_positions_size: Optional[Tuple[int, int]] = None  # 计算候选位置时的屏幕尺寸
+        self._terminal_window = None  # 上次找到的终端窗口（pygetwindow对象）
+        
+        # 操作类型分发表
+        self._action_dispatch: Dict[str, Callable[[Dict[str, Any]], Awaitable[bool]]] = {
+            "click": self.perform_click,
+            "type": self.perform_type,
+            "send_message": self.perform_send_message,
+            "key_press": self.perform_key_press,
+            "wait": self.perform_wait,
+            "analyze": self.perform_analyze,
+        }
+        self._follow_up_dispatch: Dict[str, Callable[[Dict[str, Any]], Awaitable[None]]] = {
+            "wait": self._follow_up_wait,
+            "key_press": self._follow_up_key_press,
+            "press": self._follow_up_key_press,
+            "click": self._follow_up_click,
+            "type": self._follow_up_type,
+            "restart": self._follow_up_restart,
+        }
         
     async def initialize(self) -> bool:
         """初始化自动化控制器"""
@@ -39,7 +266,7 @@ class AutomationController:
             
             # 测试屏幕访问权限
             try:
-                screenshot = pyautogui.screenshot()
+                screenshot = await _pg(pyautogui.screenshot)
                 if screenshot:
                     logger.info("✅ 屏幕访问权限正常")
                 else:
@@ -49,7 +276,11 @@ class AutomationController:
             
             # 设置安全参数
             pyautogui.FAILSAFE = True
-            pyautogui.PAUSE = 0.5
+            pyautogui.PAUSE = 0
+            
+            # 按屏幕分辨率预分配图像检测缓冲区
+            screen_width, screen_height = _screen_size()
+            self._ensure_detection_buffers(screen_height, screen_width)
             
             logger.info("✅ 自动化控制器初始化完成")
             return True
@@ -75,22 +306,9 @@ class AutomationController:
                 return False
             
             # 根据操作类型执行相应动作
-            success = False
-            if action_type == "click":
-                success = await self.perform_click(action_data)
-            elif action_type == "type":
-                success = await self.perform_type(action_data)
-            elif action_type == "send_message":
-                # send_message等同于type操作
-                logger.info("📤 send_message操作转换为type操作")
-                success = await self.perform_type(action_data)
-            elif action_type == "key_press":
-                success = await self.perform_key_press(action_data)
-            elif action_type == "wait":
-                success = await self.perform_wait(action_data)
-            elif action_type == "analyze":
-                success = True  # 分析操作总是成功
-                logger.info("执行分析操作，等待下一轮分析")
+            handler = self._action_dispatch.get(action_type)
+            if handler:
+                success = await handler(action_data)
             else:
                 logger.warning(f"未知操作类型: {action_type}")
                 success = False
@@ -118,13 +336,10 @@ class AutomationController:
                 x, y = coordinates[0], coordinates[1]
                 logger.info(f"点击坐标: ({x}, {y})")
                 
-                # 移动到目标位置
-                pyautogui.moveTo(x, y, duration=0.5)
-                await asyncio.sleep(0.2)
-                
-                # 执行点击
-                pyautogui.click()
-                await asyncio.sleep(0.5)
+                # 直接点击目标位置（不做鼠标移动动画），稍等界面响应
+                await _pg(pyautogui.click, x, y, _pause=False)
+                self._invalidate_frame()
+                await asyncio.sleep(0.1)
                 
                 return True
             
@@ -134,10 +349,9 @@ class AutomationController:
                 if click_pos:
                     x, y = click_pos
                     logger.info(f"通过目标'{target}'找到点击位置: ({x}, {y})")
-                    pyautogui.moveTo(x, y, duration=0.5)
-                    await asyncio.sleep(0.2)
-                    pyautogui.click()
-                    await asyncio.sleep(0.5)
+                    await _pg(pyautogui.click, x, y, _pause=False)
+                    self._invalidate_frame()
+                    await asyncio.sleep(0.1)
                     return True
                 else:
                     logger.warning(f"无法找到点击目标: {target}")
@@ -179,8 +393,18 @@ class AutomationController:
             logger.error(f"执行输入操作时出错: {e}")
             return False
     
-    async def perform_key_press(self, action_data: Dict[str, Any]) -> bool:
-        """执行按键操作"""
+    async def perform_send_message(self, action_data: Dict[str, Any]) -> bool:
+        """执行发送消息操作，等同于type操作"""
+        logger.info("📤 send_message操作转换为type操作")
+        return await self.perform_type(action_data)
+    
+    async def perform_analyze(self, action_data: Dict[str, Any]) -> bool:
+        """执行分析操作，分析操作总是成功"""
+        logger.info("执行分析操作，等待下一轮分析")
+        return True
+    
+    async def perform_key_press(self, action_data: Dict[str, Any], delay: float = 0.5) -> bool:
+        """执行按键操作，delay为按键后等待界面响应的秒数"""
         try:
             key_value = action_data.get("value", "")
             
@@ -190,15 +414,18 @@ class AutomationController:
             
             logger.info(f"按键: {key_value}")
             
-            # 处理组合键
-            if '+' in key_value:
-                keys = key_value.lower().split('+')
-                keys = [key.strip() for key in keys]
-                pyautogui.hotkey(*keys)
+            # 解析按键序列
+            keys = _parse_keys(key_value)
+            
+            # 处理单键和组合键
+            if len(keys) == 1:
+                await _pg(pyautogui.press, keys[0])
             else:
-                pyautogui.press(key_value.lower())
+                await _pg(pyautogui.hotkey, *keys)
+            self._invalidate_frame()
             
-            await asyncio.sleep(0.5)
+            if delay > 0:
+                await asyncio.sleep(delay)
             return True
             
         except Exception as e:
@@ -220,30 +447,169 @@ class AutomationController:
             logger.error(f"执行等待操作时出错: {e}")
             return False
     
+    def _grab_screen_np(self) -> np.ndarray:
+        """截取主屏幕，返回BGR(A)格式的numpy数组"""
+        if self._sct is None and MSS_AVAILABLE:
+            self._sct = mss.mss()
+        
+        if self._sct is not None:
+            # monitors[1]为主屏幕，与pyautogui点击坐标系一致；直接包装BGRA原始缓冲区，避免PIL转换和拷贝
+            shot = self._sct.grab(self._sct.monitors[1])
+            return np.frombuffer(shot.raw, dtype=np.uint8).reshape(shot.height, shot.width, 4)
+        
+        return cv2.cvtColor(np.asarray(pyautogui.screenshot()), cv2.COLOR_RGB2BGR)
+    
+    def _grab_region_np(self, region: Tuple[int, int, int, int]) -> np.ndarray:
+        """截取屏幕区域(left, top, width, height)，返回numpy数组"""
+        if self._sct is None and MSS_AVAILABLE:
+            self._sct = mss.mss()
+        
+        if self._sct is not None:
+            left, top, width, height = region
+            shot = self._sct.grab({"left": left, "top": top, "width": width, "height": height})
+            return np.frombuffer(shot.raw, dtype=np.uint8).reshape(shot.height, shot.width, 4)
+        
+        return np.asarray(pyautogui.screenshot(region=region))
+    
+    def _terminal_region(self) -> Tuple[int, int, int, int]:
+        """终端通常位于CURSOR底部区域，取屏幕底部40%作为回显检测区域"""
+        screen_width, screen_height = _screen_size()
+        top = int(screen_height * 0.6)
+        return (0, top, screen_width, screen_height - top)
+    
+    def _region_around(self, x: int, y: int, half_width: int = 150, half_height: int = 30) -> Tuple[int, int, int, int]:
+        """点击位置周围的小块区域(left, top, width, height)，用于检测点击后的焦点变化"""
+        screen_width, screen_height = _screen_size()
+        left = min(max(0, x - half_width), max(0, screen_width - 2 * half_width))
+        top = min(max(0, y - half_height), max(0, screen_height - 2 * half_height))
+        return (left, top, min(2 * half_width, screen_width), min(2 * half_height, screen_height))
+    
+    async def _send_and_wait_for_echo(self, send: Callable[[], Any], timeout: float,
+                                      region: Optional[Tuple[int, int, int, int]] = None) -> bool:
+        """执行输入操作后等待指定区域（默认终端区域）画面变化，一旦变化立即返回True；
+        超时返回False（最长等待时间与原来的固定等待一致）"""
+        loop = asyncio.get_running_loop()
+        try:
+            region = region or self._terminal_region()
+            baseline = await loop.run_in_executor(self._cv_pool, self._grab_region_np, region)
+        except Exception as e:
+            logger.debug(f"终端区域截屏失败，使用固定等待: {e}")
+            await _pg(send)
+            self._invalidate_frame()
+            await asyncio.sleep(timeout)
+            return False
+        
+        await _pg(send)
+        self._invalidate_frame()
+        
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            await asyncio.sleep(0.02)
+            frame = await loop.run_in_executor(self._cv_pool, self._grab_region_np, region)
+            if not np.array_equal(frame, baseline):
+                return True
+        return False
+    
+    async def _grab_screen_async(self) -> np.ndarray:
+        """在图像处理线程中截取主屏幕"""
+        return await asyncio.get_running_loop().run_in_executor(self._cv_pool, self._grab_screen_np)
+    
+    async def _get_frame(self, max_age: float = 0.1) -> np.ndarray:
+        """获取屏幕帧，max_age秒内的截屏直接复用"""
+        now = time.monotonic()
+        if self._frame_cache is not None and now - self._frame_cache[0] < max_age:
+            return self._frame_cache[1]
+        
+        frame = await self._grab_screen_async()
+        self._frame_cache = (time.monotonic(), frame)
+        return frame
+    
+    def _invalidate_frame(self):
+        """点击、按键等可能改变屏幕的操作后，丢弃缓存的屏幕帧"""
+        self._frame_cache = None
+    
+    def _load_button_templates(self, template_dir: str = _BUTTON_TEMPLATE_DIR) -> Dict[str, List[np.ndarray]]:
+        """加载按钮模板（灰度并缩小一级），文件名前缀为按钮名，如 continue.png、ok_dark.png"""
+        templates: Dict[str, List[np.ndarray]] = {}
+        for path in sorted(glob.glob(os.path.join(template_dir, "*.png"))):
+            tpl = cv2.imread(path, cv2.IMREAD_GRAYSCALE)
+            if tpl is None:
+                continue
+            name = os.path.splitext(os.path.basename(path))[0].split("_")[0].lower()
+            templates.setdefault(name, []).append(cv2.pyrDown(tpl))
+        
+        if templates:
+            logger.info(f"已加载按钮模板: {', '.join(templates)}")
+        return templates
+    
+    def _ensure_detection_buffers(self, height: int, width: int):
+        """按图像尺寸分配检测缓冲区，尺寸不变时复用"""
+        if self._gray_buf is not None and self._gray_buf.shape == (height, width):
+            return
+        self._gray_buf = np.empty((height, width), dtype=np.uint8)
+        self._small_buf = np.empty(((height + 1) // 2, (width + 1) // 2), dtype=np.uint8)
+        self._edges_buf = np.empty_like(self._small_buf)
+    
+    def _to_small_gray(self, img_array: np.ndarray) -> np.ndarray:
+        """将BGR/BGRA截屏转换为缩小一级的灰度图，写入复用缓冲区"""
+        height, width = img_array.shape[:2]
+        self._ensure_detection_buffers(height, width)
+        
+        code = cv2.COLOR_BGRA2GRAY if img_array.shape[2] == 4 else cv2.COLOR_BGR2GRAY
+        cv2.cvtColor(img_array, code, dst=self._gray_buf)
+        cv2.pyrDown(self._gray_buf, dst=self._small_buf)
+        return self._small_buf
+    
+    def _match_button_templates(self, img_array: np.ndarray, names: List[str]) -> Optional[Tuple[int, int]]:
+        """在缩小一级的灰度截屏上匹配按钮模板，返回最佳匹配中心点（原始分辨率）"""
+        small = self._to_small_gray(img_array)
+        scale = 2
+        
+        best_score, best_pos = 0.0, None
+        for name in names:
+            for index, tpl in enumerate(self._templates.get(name, [])):
+                tpl_h, tpl_w = tpl.shape[:2]
+                if tpl_h > small.shape[0] or tpl_w > small.shape[1]:
+                    continue
+                
+                # 复用匹配结果缓冲区
+                buf_key = (name, index)
+                result_shape = (small.shape[0] - tpl_h + 1, small.shape[1] - tpl_w + 1)
+                buf = self._match_bufs.get(buf_key)
+                if buf is None or buf.shape != result_shape:
+                    buf = np.empty(result_shape, dtype=np.float32)
+                    self._match_bufs[buf_key] = buf
+                
+                cv2.matchTemplate(small, tpl, cv2.TM_CCOEFF_NORMED, result=buf)
+                _, score, _, (x, y) = cv2.minMaxLoc(buf)
+                if score > best_score:
+                    best_score = score
+                    best_pos = ((x + tpl_w // 2) * scale, (y + tpl_h // 2) * scale)
+        
+        if best_pos and best_score > 0.85:
+            logger.debug(f"模板匹配得分: {best_score:.2f}")
+            return best_pos
+        return None
+    
     async def find_click_target(self, target: str) -> Optional[Tuple[int, int]]:
         """根据目标描述找到点击位置"""
         try:
-            # 截取当前屏幕
-            screenshot = pyautogui.screenshot()
-            
-            # 常见的UI元素关键词映射
-            target_keywords = {
-                "continue": ["continue", "继续", "next", "下一步"],
-                "ok": ["ok", "确定", "confirm", "确认"],
-                "cancel": ["cancel", "取消", "close", "关闭"],
-                "yes": ["yes", "是", "确定"],
-                "no": ["no", "否", "取消"],
-                "run": ["run", "运行", "execute", "执行"],
-                "stop": ["stop", "停止", "halt"],
-                "save": ["save", "保存"],
-                "input": ["input", "输入框", "text", "field"]
-            }
-            
-            # 使用OCR识别屏幕文本并查找目标
-            # 这里简化实现，实际可以集成更复杂的图像识别
-            
-            # 暂时返回屏幕中心作为默认点击位置
-            screen_width, screen_height = pyautogui.size()
+            # 根据关键词确定候选按钮模板
+            target_lower = target.lower()
+            names = [name for name, keyword_re in self._target_keyword_res.items()
+                     if name in self._templates and keyword_re.search(target_lower)]
+            
+            if names:
+                # 截取当前屏幕并进行模板匹配
+                screenshot = await self._get_frame()
+                click_pos = await asyncio.get_running_loop().run_in_executor(
+                    self._cv_pool, self._match_button_templates, screenshot, names
+                )
+                if click_pos:
+                    return click_pos
+            
+            # 未匹配到模板时返回屏幕中心作为默认点击位置
+            screen_width, screen_height = _screen_size()
             center_x, center_y = screen_width // 2, screen_height // 2
             
             logger.debug(f"未找到特定目标'{target}'，返回屏幕中心位置")
@@ -258,47 +624,65 @@ class AutomationController:
         if not self.safe_mode:
             return True
         
-        action_type = action_data.get("action_type", "")
-        target = action_data.get("target", "").lower()
-        value = str(action_data.get("value", "")).lower()
-        reasoning = action_data.get("reasoning", "").lower()
-        
-        # 检查危险操作
-        dangerous_keywords = ["delete", "remove", "clear", "reset", "format", "destroy"]
-        
-        for keyword in dangerous_keywords:
-            if keyword in target or keyword in value or keyword in reasoning:
-                confidence = action_data.get("confidence", 0)
-                if confidence < 0.8:
-                    logger.warning(f"检测到潜在危险操作'{keyword}'，置信度过低({confidence})，跳过执行")
-                    return False
-        
-        # 检查操作频率（防止无限循环）
-        recent_actions = [action for action in self.action_history 
-                         if time.time() - action.get("timestamp", 0) < 10]
+        action_type = action_data.get("action_type", "unknown")
+        target = action_data.get("target", "")
+        value = action_data.get("value", "")
+        reasoning = action_data.get("reasoning", "")
         
-        if len(recent_actions) > 5:
-            similar_actions = [action for action in recent_actions 
-                             if action.get("action_type") == action_type]
-            if len(similar_actions) > 3:
-                logger.warning("检测到重复操作过于频繁，可能存在循环，暂停执行")
+        # 检查危险操作（单次正则扫描目标、输入值和理由）
+        match = self._danger_re.search(f"{target}\0{value}\0{reasoning}")
+        if match:
+            confidence = action_data.get("confidence", 0)
+            if confidence < 0.8:
+                logger.warning(f"检测到潜在危险操作'{match.group(0).lower()}'，置信度过低({confidence})，跳过执行")
                 return False
         
+        # 检查操作频率（防止无限循环）：按类型维护的最近10秒操作计数
+        self._prune_recent_by_type(time.time())
+        recent_by_type = self._recent_by_type
+        if sum(len(v) for v in recent_by_type.values()) > 5 and len(recent_by_type.get(action_type, ())) > 3:
+            logger.warning("检测到重复操作过于频繁，可能存在循环，暂停执行")
+            return False
+        
         return True
     
+    def _prune_recent_by_type(self, now: float):
+        """移除超过10秒的按类型操作时间戳"""
+        for action_type in list(self._recent_by_type):
+            timestamps = self._recent_by_type[action_type]
+            while timestamps and now - timestamps[0] >= 10:
+                timestamps.popleft()
+            if not timestamps:
+                del self._recent_by_type[action_type]
+    
+    def _prune_recent_actions(self, now: float):
+        """移除超过5分钟的操作记录及其类型计数"""
+        recent_time = now - 300  # 最近5分钟
+        while self._recent_actions and self._recent_actions[0][0] <= recent_time:
+            _, action_type = self._recent_actions.popleft()
+            self._recent_type_counts[action_type] -= 1
+            if self._recent_type_counts[action_type] <= 0:
+                del self._recent_type_counts[action_type]
+    
     def record_action(self, action_data: Dict[str, Any]):
         """记录操作历史"""
+        timestamp = time.time()
         action_record = {
             **action_data,
-            "timestamp": time.time(),
+            "timestamp": timestamp,
             "execution_id": len(self.action_history)
         }
         
+        # deque自动保持历史记录长度限制
         self.action_history.append(action_record)
         
-        # 保持历史记录长度限制
-        if len(self.action_history) > self.max_history_length:
-            self.action_history = self.action_history[-self.max_history_length:]
+        action_type = action_data.get("action_type", "unknown")
+        self._recent_actions.append((timestamp, action_type))
+        self._recent_type_counts[action_type] += 1
+        self._prune_recent_actions(timestamp)
+        
+        self._recent_by_type[action_type].append(timestamp)
+        self._prune_recent_by_type(timestamp)
     
     async def execute_follow_up_actions(self, follow_up_actions):
         """执行后续操作"""
@@ -315,39 +699,14 @@ class AutomationController:
                     # 提取操作信息
                     action_type = action_item.get("action_type", "").lower()
                     target = action_item.get("target", "").lower()
-                    value = action_item.get("value", "")
                     reasoning = action_item.get("reasoning", "")
                     
                     logger.info(f"后续操作类型: {action_type}, 目标: {target}, 理由: {reasoning}")
                     
                     # 根据操作类型执行
-                    if action_type == "wait":
-                        wait_time = 2
-                        if value and isinstance(value, (int, float)):
-                            wait_time = value
-                        await asyncio.sleep(wait_time)
-                    elif action_type == "key_press" or action_type == "press":
-                        if value:
-                            pyautogui.press(value.lower())
-                        elif "enter" in reasoning.lower():
-                            pyautogui.press('enter')
-                        elif "escape" in reasoning.lower():
-                            pyautogui.press('escape')
-                        await asyncio.sleep(0.5)
-                    elif action_type == "click":
-                        coordinates = action_item.get("coordinates")
-                        if coordinates and len(coordinates) >= 2:
-                            x, y = coordinates[0], coordinates[1]
-                            pyautogui.click(x, y)
-                            await asyncio.sleep(0.5)
-                    elif action_type == "type":
-                        if value:
-                            # 这是一个简化的输入，仅记录日志
-                            logger.info(f"建议执行命令: {value}")
-                            # 实际情况下，这种复杂操作应该通过主要的execute_action方法处理
-                    elif action_type == "restart":
-                        logger.info(f"建议重启操作: {target}")
-                        # 重启操作通常需要更复杂的逻辑，这里仅记录
+                    handler = self._follow_up_dispatch.get(action_type)
+                    if handler:
+                        await handler(action_item)
                     else:
                         logger.info(f"未知的后续操作类型: {action_type}")
                 
@@ -371,25 +730,68 @@ class AutomationController:
         except Exception as e:
             logger.error(f"执行后续操作时出错: {e}")
     
+    async def _follow_up_wait(self, action_item: Dict[str, Any]):
+        """后续操作：等待"""
+        value = action_item.get("value", "")
+        wait_time = 2
+        if value and isinstance(value, (int, float)):
+            wait_time = value
+        await asyncio.sleep(wait_time)
+    
+    async def _follow_up_key_press(self, action_item: Dict[str, Any]):
+        """后续操作：按键"""
+        value = action_item.get("value", "")
+        reasoning = action_item.get("reasoning", "")
+        if value:
+            pyautogui.press(value.lower())
+        elif "enter" in reasoning.lower():
+            pyautogui.press('enter')
+        elif "escape" in reasoning.lower():
+            pyautogui.press('escape')
+        self._invalidate_frame()
+        await asyncio.sleep(0.5)
+    
+    async def _follow_up_click(self, action_item: Dict[str, Any]):
+        """后续操作：点击"""
+        coordinates = action_item.get("coordinates")
+        if coordinates and len(coordinates) >= 2:
+            x, y = coordinates[0], coordinates[1]
+            pyautogui.click(x, y)
+            self._invalidate_frame()
+            await asyncio.sleep(0.5)
+    
+    async def _follow_up_type(self, action_item: Dict[str, Any]):
+        """后续操作：输入"""
+        value = action_item.get("value", "")
+        if value:
+            # 这是一个简化的输入，仅记录日志
+            logger.info(f"建议执行命令: {value}")
+            # 实际情况下，这种复杂操作应该通过主要的execute_action方法处理
+    
+    async def _follow_up_restart(self, action_item: Dict[str, Any]):
+        """后续操作：重启"""
+        target = action_item.get("target", "").lower()
+        logger.info(f"建议重启操作: {target}")
+        # 重启操作通常需要更复杂的逻辑，这里仅记录
+    
     def get_action_stats(self) -> Dict[str, Any]:
         """获取操作统计信息"""
-        recent_time = time.time() - 300  # 最近5分钟
-        recent_actions = [action for action in self.action_history 
-                         if action.get("timestamp", 0) > recent_time]
-        
-        action_types = {}
-        for action in recent_actions:
-            action_type = action.get("action_type", "unknown")
-            action_types[action_type] = action_types.get(action_type, 0) + 1
+        self._prune_recent_actions(time.time())
         
         return {
             "total_actions": len(self.action_history),
-            "recent_actions": len(recent_actions),
-            "action_types": action_types,
+            "recent_actions": len(self._recent_actions),
+            "action_types": dict(self._recent_type_counts),
             "last_action_time": self.last_action_time,
             "safe_mode": self.safe_mode
         }
     
+    def invalidate_screen_cache(self):
+        """屏幕分辨率变化后清除缓存的屏幕尺寸及相关位置"""
+        _screen_size_at.cache_clear()
+        self._terminal_positions = None
+        self._invalidate_frame()
+    
     def set_safe_mode(self, enabled: bool):
         """设置安全模式"""
         self.safe_mode = enabled
@@ -398,6 +800,9 @@ class AutomationController:
     def clear_action_history(self):
         """清空操作历史"""
         self.action_history.clear()
+        self._recent_actions.clear()
+        self._recent_type_counts.clear()
+        self._recent_by_type.clear()
         logger.info("操作历史已清空")
     
     async def emergency_stop(self):
@@ -412,27 +817,26 @@ class AutomationController:
         try:
             logger.info("尝试点击CURSOR对话框输入区域...")
             
-            # 获取当前屏幕截图用于分析
-            screenshot = pyautogui.screenshot()
-            
-            # 尝试多种策略找到输入框
-            input_positions = await self.find_dialog_input_positions(screenshot)
-            
-            for position in input_positions:
+            # 按代价由低到高尝试多种策略找到输入框（前面的位置都失败时才截屏分析）
+            async for position in self.find_dialog_input_positions():
                 try:
                     x, y = position
                     logger.info(f"尝试点击输入框位置: ({x}, {y})")
                     
-                    # 移动并点击
-                    pyautogui.moveTo(x, y, duration=0.3)
-                    await asyncio.sleep(0.2)
-                    pyautogui.click()
-                    await asyncio.sleep(0.5)
+                    # 点击后检测点击位置附近画面是否变化（光标、焦点边框出现），不做剪贴板验证；
+                    # 上次已确认过的位置再次点击可能没有画面变化，直接信任
+                    trusted = position == self._last_input_pos
+                    changed = await self._send_and_wait_for_echo(
+                        lambda: pyautogui.click(x, y, _pause=False), timeout=0.5,
+                        region=self._region_around(int(x), int(y))
+                    )
+                    if not (changed or trusted):
+                        logger.debug(f"点击位置 ({x}, {y}) 后画面无变化，尝试下一个位置")
+                        continue
                     
-                    # 验证是否成功（检查是否有光标）
-                    if await self.verify_input_focus():
-                        logger.info("成功点击输入框")
-                        return True
+                    logger.info("成功点击输入框")
+                    self._last_input_pos = (x, y)
+                    return True
                         
                 except Exception as e:
                     logger.debug(f"点击位置 ({x}, {y}) 失败: {e}")
@@ -445,70 +849,90 @@ class AutomationController:
             logger.error(f"点击对话框输入区域时出错: {e}")
             return False
     
-    async def find_dialog_input_positions(self, screenshot: Image.Image) -> List[Tuple[int, int]]:
-        """找到可能的对话框输入位置 - 优化版：基于保存的区域配置"""
+    def _load_json_cached(self, path: str) -> Tuple[Optional[float], Dict[str, Any]]:
+        """读取JSON配置文件，仅在文件修改时间变化时重新解析；文件不存在返回(None, {})"""
+        try:
+            mtime = os.stat(path).st_mtime
+        except OSError:
+            self._cfg_cache.pop(path, None)
+            return None, {}
+        
+        cached = self._cfg_cache.get(path)
+        if cached and cached[0] == mtime:
+            return cached
+        
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        self._cfg_cache[path] = (mtime, data)
+        return mtime, data
+    
+    def _get_config_input_positions(self) -> List[Tuple[int, int]]:
+        """根据保存的区域配置推算输入框位置，配置文件未变化时直接返回缓存结果"""
         positions = []
         
         try:
-            # 转换为numpy数组进行分析
-            img_array = np.array(screenshot)
-            height, width = img_array.shape[:2]
-            
-            # 首先尝试从保存的输入框配置中获取位置
-            try:
-                import json
-                import os
-                
-                # 检查新的输入框配置文件
-                input_box_config_file = "input_box_config.json"
-                if os.path.exists(input_box_config_file):
-                    with open(input_box_config_file, 'r', encoding='utf-8') as f:
-                        input_config = json.load(f)
-                    
-                    input_box = input_config.get("input_box", {})
-                    if input_box:
-                        # 使用输入框中心点作为点击位置
-                        center_x = input_box.get("center_x")
-                        center_y = input_box.get("center_y")
-                        if center_x and center_y:
-                            logger.info(f"✅ 使用用户选择的输入框位置: ({center_x}, {center_y})")
+            input_mtime, input_config = self._load_json_cached("input_box_config.json")
+            cursor_mtime, cursor_config = self._load_json_cached("cursor_chat_config.json")
+            regions_mtime, regions_config = self._load_json_cached("window_regions.json")
+            
+            cache_key = (input_mtime, cursor_mtime, regions_mtime)
+            if self._config_positions_cache and self._config_positions_cache[0] == cache_key:
+                return list(self._config_positions_cache[1])
+            
+            # 配置发生变化，之前点击的输入框位置失效
+            self._last_input_pos = None
+            
+            # 检查新的输入框配置文件
+            if input_config:
+                input_box = input_config.get("input_box", {})
+                if input_box:
+                    # 使用输入框中心点作为点击位置
+                    center_x = input_box.get("center_x")
+                    center_y = input_box.get("center_y")
+                    if center_x and center_y:
+                        logger.info(f"✅ 使用用户选择的输入框位置: ({center_x}, {center_y})")
+                        positions.append((center_x, center_y))
+                    else:
+                        # 如果没有中心点，计算中心点
+                        x = input_box.get("x")
+                        y = input_box.get("y")
+                        w = input_box.get("width")
+                        h = input_box.get("height")
+                        if x is not None and y is not None and w and h:
+                            center_x = x + w // 2
+                            center_y = y + h // 2
+                            logger.info(f"✅ 计算的输入框中心位置: ({center_x}, {center_y})")
                             positions.append((center_x, center_y))
-                        else:
-                            # 如果没有中心点，计算中心点
-                            x = input_box.get("x")
-                            y = input_box.get("y")
-                            w = input_box.get("width")
-                            h = input_box.get("height")
-                            if x is not None and y is not None and w and h:
-                                center_x = x + w // 2
-                                center_y = y + h // 2
-                                logger.info(f"✅ 计算的输入框中心位置: ({center_x}, {center_y})")
-                                positions.append((center_x, center_y))
-                
-                # 检查是否有保存的CURSOR聊天配置（向后兼容）
-                cursor_config_file = "cursor_chat_config.json"
-                if os.path.exists(cursor_config_file):
-                    with open(cursor_config_file, 'r', encoding='utf-8') as f:
-                        cursor_config = json.load(f)
-                    
-                    chat_region = cursor_config.get("cursor_chat_region", {})
-                    if chat_region:
-                        input_x = chat_region.get("input_x")
-                        input_y = chat_region.get("input_y")
-                        if input_x and input_y:
-                            logger.info(f"使用保存的CURSOR输入框位置: ({input_x}, {input_y})")
-                            positions.append((input_x, input_y))
-                
-                # 检查window_regions.json中的区域配置
-                regions_config_file = "window_regions.json"
-                if os.path.exists(regions_config_file):
-                    with open(regions_config_file, 'r', encoding='utf-8') as f:
-                        regions_config = json.load(f)
-                    
-                    # 遍历所有保存的区域
-                    for config_name, config_data in regions_config.items():
-                        if "region" in config_data:
-                            region = config_data["region"]
+            
+            # 检查是否有保存的CURSOR聊天配置（向后兼容）
+            if cursor_config:
+                chat_region = cursor_config.get("cursor_chat_region", {})
+                if chat_region:
+                    input_x = chat_region.get("input_x")
+                    input_y = chat_region.get("input_y")
+                    if input_x and input_y:
+                        logger.info(f"使用保存的CURSOR输入框位置: ({input_x}, {input_y})")
+                        positions.append((input_x, input_y))
+            
+            # 检查window_regions.json中的区域配置
+            if regions_config:
+                # 遍历所有保存的区域
+                for config_name, config_data in regions_config.items():
+                    if "region" in config_data:
+                        region = config_data["region"]
+                        x, y = region["x"], region["y"]
+                        w, h = region["width"], region["height"]
+                        
+                        # 输入框通常在区域的底部
+                        input_x = x + w // 2  # 水平居中
+                        input_y = y + h - 50  # 距离底部50像素
+                        
+                        logger.info(f"基于保存区域 {config_name} 推算输入框位置: ({input_x}, {input_y})")
+                        positions.append((input_x, input_y))
+                        
+                    elif "regions" in config_data:
+                        # 新格式：多区域
+                        for region in config_data["regions"]:
                             x, y = region["x"], region["y"]
                             w, h = region["width"], region["height"]
                             
@@ -516,79 +940,86 @@ class AutomationController:
                             input_x = x + w // 2  # 水平居中
                             input_y = y + h - 50  # 距离底部50像素
                             
-                            logger.info(f"基于保存区域 {config_name} 推算输入框位置: ({input_x}, {input_y})")
+                            logger.info(f"基于保存区域推算输入框位置: ({input_x}, {input_y})")
                             positions.append((input_x, input_y))
-                            
-                        elif "regions" in config_data:
-                            # 新格式：多区域
-                            for region in config_data["regions"]:
-                                x, y = region["x"], region["y"]
-                                w, h = region["width"], region["height"]
-                                
-                                # 输入框通常在区域的底部
-                                input_x = x + w // 2  # 水平居中
-                                input_y = y + h - 50  # 距离底部50像素
-                                
-                                logger.info(f"基于保存区域推算输入框位置: ({input_x}, {input_y})")
-                                positions.append((input_x, input_y))
             
-            except Exception as e:
-                logger.debug(f"读取保存的区域配置时出错: {e}")
-            
-            # 如果没有找到保存的配置，使用优化的默认策略
-            if not positions:
-                logger.info("未找到保存的区域配置，使用默认输入框坐标 (1820, 950)")
-                
-                # 使用我们确认的Agent按钮上方的输入框坐标
-                positions.append((1820, 950))
-                
-                # 添加一些备用位置作为fallback
-                positions.append((1820, 920))  # 稍微上移一点
-                positions.append((1770, 950))  # 稍微左移一点
-                positions.append((1820, 980))  # 稍微下移一点
-                
-                # 策略: 查找屏幕右侧区域（通常是对话框区域）
-                right_half_x = width * 0.6  # 右侧60%区域
-                bottom_area_y = height * 0.8  # 底部20%区域
-                
-                # 在右下角区域寻找可能的输入框
-                positions.append((int(right_half_x + (width - right_half_x) / 2), int(bottom_area_y + (height - bottom_area_y) / 2)))
-                
-                # 策略: 查找屏幕底部中央区域
-                positions.append((width // 2, int(height * 0.9)))
-                
-                # 策略: 查找右侧中央区域
-                positions.append((int(width * 0.8), height // 2))
-                
-                # 策略: 使用图像处理找到可能的输入框区域
-                input_boxes = await self.detect_input_boxes(img_array)
-                positions.extend(input_boxes)
-            
-            logger.debug(f"找到 {len(positions)} 个可能的输入框位置")
-            return positions
+            self._config_positions_cache = (cache_key, list(positions))
             
+        except Exception as e:
+            logger.debug(f"读取保存的区域配置时出错: {e}")
+        
+        return positions
+    
+    async def find_dialog_input_positions(self) -> AsyncIterator[Tuple[int, int]]:
+        """按代价由低到高依次给出可能的对话框输入位置：保存的区域配置 -> 默认坐标 -> 截屏图像检测"""
+        # 首先尝试从保存的区域配置中获取位置（按配置文件修改时间缓存）
+        config_positions = self._get_config_input_positions()
+        for position in config_positions:
+            yield position
+        
+        if not config_positions:
+            logger.info("未找到保存的区域配置，使用默认输入框坐标 (1820, 950)")
+        
+        # 使用我们确认的Agent按钮上方的输入框坐标
+        yield (1820, 950)
+        
+        # 添加一些备用位置作为fallback
+        yield (1820, 920)  # 稍微上移一点
+        yield (1770, 950)  # 稍微左移一点
+        yield (1820, 980)  # 稍微下移一点
+        
+        width, height = _screen_size()
+        
+        # 策略: 查找屏幕右侧区域（通常是对话框区域）
+        right_half_x = width * 0.6  # 右侧60%区域
+        bottom_area_y = height * 0.8  # 底部20%区域
+        
+        # 在右下角区域寻找可能的输入框
+        yield (int(right_half_x + (width - right_half_x) / 2), int(bottom_area_y + (height - bottom_area_y) / 2))
+        
+        # 策略: 查找屏幕底部中央区域
+        yield (width // 2, int(height * 0.9))
+        
+        # 策略: 查找右侧中央区域
+        yield (int(width * 0.8), height // 2)
+        
+        # 策略: 前面的位置都失败时，才截屏并使用图像处理找到可能的输入框区域
+        try:
+            img_array = await self._get_frame()
+            input_boxes = await self.detect_input_boxes(img_array)
         except Exception as e:
             logger.error(f"查找输入框位置时出错: {e}")
-            # 出错时也使用我们确认的坐标作为默认值
-            return [(1820, 950)]
+            return
+        
+        logger.debug(f"图像检测找到 {len(input_boxes)} 个可能的输入框位置")
+        for position in input_boxes:
+            yield position
     
     async def detect_input_boxes(self, img_array: np.ndarray) -> List[Tuple[int, int]]:
+        """使用图像处理检测输入框（在图像处理线程中执行）"""
+        return await asyncio.get_running_loop().run_in_executor(
+            self._cv_pool, self._detect_input_boxes_sync, img_array
+        )
+    
+    def _detect_input_boxes_sync(self, img_array: np.ndarray) -> List[Tuple[int, int]]:
         """使用图像处理检测输入框"""
         positions = []
         
         try:
-            # 转换为灰度图
-            gray = cv2.cvtColor(img_array, cv2.COLOR_RGB2GRAY)
+            # 图像金字塔：在缩小一级的灰度图上做边缘检测，像素量减少为1/4
+            small = self._to_small_gray(img_array)
+            scale = 2
             
             # 边缘检测
-            edges = cv2.Canny(gray, 50, 150)
+            edges = cv2.Canny(small, 50, 150, edges=self._edges_buf)
             
             # 查找轮廓
-            contours, _ = cv2.findContours(edges, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+            contours, _ = cv2.findContours(edges, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_TC89_L1)
             
             for contour in contours:
-                # 计算边界框
+                # 计算边界框并还原到原始分辨率
                 x, y, w, h = cv2.boundingRect(contour)
+                x, y, w, h = x * scale, y * scale, w * scale, h * scale
                 
                 # 过滤条件：宽度合适，高度较小（像输入框）
                 if w > 100 and 20 < h < 60 and w/h > 5:
@@ -606,40 +1037,13 @@ class AutomationController:
             logger.debug(f"图像处理检测输入框时出错: {e}")
             return []
     
-    async def verify_input_focus(self) -> bool:
-        """验证输入框是否获得焦点"""
-        try:
-            # 简单的验证：尝试输入一个空格然后删除
-            original_clipboard = pyautogui.paste()  # 保存剪贴板
-            
-            # 输入测试字符
-            pyautogui.typewrite(' ')
-            await asyncio.sleep(0.1)
-            
-            # 选择并复制
-            pyautogui.hotkey('shift', 'left')
-            await asyncio.sleep(0.1)
-            pyautogui.hotkey('ctrl', 'c')
-            await asyncio.sleep(0.1)
-            
-            # 检查是否复制到了空格
-            copied_text = pyautogui.paste()
-            
-            # 删除测试字符
-            pyautogui.press('delete')
-            
-            # 恢复剪贴板（如果可能）
-            if original_clipboard:
-                pyautogui.hotkey('ctrl', 'v')
-                pyautogui.hotkey('ctrl', 'a')
-                pyautogui.press('delete')
-            
-            return copied_text == ' '
-            
-        except Exception as e:
-            logger.debug(f"验证输入焦点时出错: {e}")
-            return True  # 默认认为成功
-
+    def _insert_text(self, text: str):
+        """通过剪贴板粘贴输入文本（一次系统事件，替代逐字符typewrite）"""
+        import pyperclip
+        pyperclip.copy(text)
+        pyautogui.hotkey('ctrl', 'v')
+        self._invalidate_frame()
+    
     async def verify_message_sent(self) -> bool:
         """验证发送后输入框是否为空"""
         import pyperclip
@@ -659,17 +1063,8 @@ class AutomationController:
         try:
             logger.info("使用备用点击策略...")
             
-            # 尝试Tab键导航到输入框
-            for _ in range(10):
-                pyautogui.press('tab')
-                await asyncio.sleep(0.2)
-                
-                if await self.verify_input_focus():
-                    logger.info("通过Tab键找到输入框")
-                    return True
-            
-            # 尝试点击屏幕的常见输入区域
-            screen_width, screen_height = pyautogui.size()
+            # 尝试点击屏幕的常见输入区域（不做剪贴板往返验证，只看点击位置附近画面是否响应）
+            screen_width, screen_height = _screen_size()
             
             common_positions = [
                 (screen_width * 0.75, screen_height * 0.9),  # 右下角
@@ -679,11 +1074,12 @@ class AutomationController:
             
             for x, y in common_positions:
                 try:
-                    pyautogui.click(int(x), int(y))
-                    await asyncio.sleep(0.5)
-                    
-                    if await self.verify_input_focus():
-                        logger.info(f"通过常见位置 ({int(x)}, {int(y)}) 找到输入框")
+                    x, y = int(x), int(y)
+                    if await self._send_and_wait_for_echo(
+                        lambda: pyautogui.click(x, y), timeout=0.5, region=self._region_around(x, y)
+                    ):
+                        logger.info(f"通过常见位置 ({x}, {y}) 找到输入框")
+                        self._last_input_pos = (x, y)
                         return True
                         
                 except Exception:
@@ -750,71 +1146,71 @@ class AutomationController:
         for attempt in range(1, max_retries + 1):
             try:
                 logger.info(f"📋 第{attempt}次尝试粘贴文本...")
-                # 保存原始剪贴板内容
-                try:
-                    original_clipboard = pyperclip.paste()
-                except:
-                    original_clipboard = ""
+                # 保存原始剪贴板内容（仅在需要保留用户剪贴板时）
+                original_clipboard = ""
+                if self.preserve_clipboard:
+                    try:
+                        original_clipboard = pyperclip.paste()
+                    except:
+                        pass
                 
-                # 粘贴前确认焦点
-                await asyncio.sleep(0.1)
-                pyautogui.hotkey('ctrl', 'a')
-                await asyncio.sleep(0.1)
-                pyautogui.press('delete')
-                await asyncio.sleep(0.2)
+                # 粘贴前清空输入框
+                await _pg(pyautogui.hotkey, 'ctrl', 'a')
+                await asyncio.sleep(0.05)
+                await _pg(pyautogui.press, 'delete')
+                await asyncio.sleep(0.05)
                 
                 # 再次点击输入框确保焦点
                 await self.click_dialog_input()
                 await asyncio.sleep(0.2)
                 
-                # 将文本复制到剪贴板
-                pyperclip.copy(text)
-                await asyncio.sleep(0.3)
+                # 将文本复制到剪贴板，并确认剪贴板已写入
+                await _pg(pyperclip.copy, text)
+                await asyncio.sleep(0.1)
+                if pyperclip.paste() != text:
+                    logger.warning("❌ 剪贴板写入失败，重试")
+                    await asyncio.sleep(0.5)
+                    continue
                 
                 # 粘贴文本
-                pyautogui.hotkey('ctrl', 'v')
+                await _pg(pyautogui.hotkey, 'ctrl', 'v')
                 await asyncio.sleep(1.0)  # 粘贴后等待更久
                 
-                # 粘贴后再次确认焦点
-                await self.click_dialog_input()
-                await asyncio.sleep(0.2)
-                
-                # 验证粘贴结果
-                pyautogui.hotkey('ctrl', 'a')
-                await asyncio.sleep(0.1)
-                pyautogui.hotkey('ctrl', 'c')
-                await asyncio.sleep(0.3)
+                # 粘贴后再次确认焦点（复用本次已定位的输入框位置）
+                if self._last_input_pos:
+                    await _pg(pyautogui.click, *self._last_input_pos)
+                    await asyncio.sleep(0.2)
                 
-                try:
+                # 调试模式下回读输入框内容验证粘贴结果（需额外的全选、复制按键往返）
+                if self.verify_paste:
+                    await _pg(pyautogui.hotkey, 'ctrl', 'a')
+                    await asyncio.sleep(0.1)
+                    await _pg(pyautogui.hotkey, 'ctrl', 'c')
+                    await asyncio.sleep(0.3)
+                    
                     pasted_content = pyperclip.paste()
-                    success = len(pasted_content) >= len(text) * 0.9
-                    if success:
-                        logger.info(f"✅ 文本粘贴成功，长度: {len(pasted_content)}")
-                        pyautogui.press('end')
-                        # 恢复原始剪贴板内容
-                        try:
-                            pyperclip.copy(original_clipboard)
-                        except:
-                            pass
-                        return True
-                    else:
+                    if len(pasted_content) < len(text) * 0.9:
                         logger.warning(f"❌ 粘贴验证失败，原始: {len(text)}, 粘贴: {len(pasted_content)}，内容: {pasted_content}")
+                        self._last_input_pos = None
                         # 恢复原始剪贴板内容
-                        try:
-                            pyperclip.copy(original_clipboard)
-                        except:
-                            pass
+                        if self.preserve_clipboard:
+                            try:
+                                pyperclip.copy(original_clipboard)
+                            except:
+                                pass
                         # 重试前等待
                         await asyncio.sleep(0.5)
                         continue
-                except Exception as e:
-                    logger.error(f"❌ 粘贴验证异常: {e}")
+                
+                logger.info(f"✅ 文本粘贴完成，长度: {len(text)}")
+                await _pg(pyautogui.press, 'end')
+                # 恢复原始剪贴板内容
+                if self.preserve_clipboard:
                     try:
                         pyperclip.copy(original_clipboard)
                     except:
                         pass
-                    await asyncio.sleep(0.5)
-                    continue
+                return True
             except Exception as e:
                 logger.error(f"❌ 粘贴输入异常: {e}")
                 await asyncio.sleep(0.5)
@@ -837,13 +1233,17 @@ class AutomationController:
             
             # 步骤3: 输入命令
             logger.info(f"📝 在终端输入命令: {command}")
-            pyautogui.typewrite(command, interval=0.05)
-            await asyncio.sleep(0.5)
+            if _IS_WINDOWS:
+                # Windows下一次SendInput批量输入，不占用剪贴板
+                send_command = lambda: _send_text_batched(command) or self._insert_text(command)
+            else:
+                # 其他平台终端的Ctrl+V不一定是粘贴，保持逐字符按键输入
+                send_command = lambda: pyautogui.typewrite(command, interval=0.05)
+            await self._send_and_wait_for_echo(send_command, timeout=0.5)
             
             # 步骤4: 执行命令
             logger.info("⚡ 执行命令...")
-            pyautogui.press('enter')
-            await asyncio.sleep(1)
+            await self._send_and_wait_for_echo(lambda: pyautogui.press('enter'), timeout=1.0)
             
             logger.info("✅ 终端命令执行完成")
             return True
@@ -884,27 +1284,28 @@ class AutomationController:
     async def find_terminal_by_title(self) -> bool:
         """通过窗口标题查找终端"""
         try:
-            import psutil
-            import subprocess
-            import platform
-            
-            if platform.system() == "Windows":
-                # Windows下查找PowerShell或CMD窗口
-                terminal_titles = [
-                    "Windows PowerShell",
-                    "powershell",
-                    "Command Prompt", 
-                    "cmd",
-                    "Terminal",
-                    "Git Bash"
-                ]
+            if _IS_WINDOWS:
+                # 优先复用上次找到的终端窗口，避免逐个标题重新枚举窗口
+                window = self._terminal_window
+                if window is not None:
+                    try:
+                        if window.isActive:
+                            return True
+                        await _pg(window.activate)
+                        await asyncio.sleep(0.5)
+                        logger.info(f"✅ 重新激活终端窗口: {window.title}")
+                        return True
+                    except Exception as e:
+                        logger.debug(f"缓存的终端窗口已失效: {e}")
+                        self._terminal_window = None
                 
-                for title in terminal_titles:
+                for title in _TERMINAL_TITLES:
                     try:
-                        windows = pyautogui.getWindowsWithTitle(title)
+                        windows = await _pg(pyautogui.getWindowsWithTitle, title)
                         if windows:
                             window = windows[0]
-                            window.activate()
+                            await _pg(window.activate)
+                            self._terminal_window = window
                             await asyncio.sleep(0.5)
                             logger.info(f"✅ 找到并激活终端窗口: {title}")
                             return True
@@ -921,21 +1322,11 @@ class AutomationController:
     async def open_terminal_with_shortcut(self) -> bool:
         """使用快捷键打开终端"""
         try:
-            import platform
-            
-            if platform.system() == "Windows":
-                # 在CURSOR中打开终端的常见快捷键
-                shortcuts = [
-                    ['ctrl', 'shift', 'grave'],  # Ctrl+Shift+` (常见的终端快捷键)
-                    ['ctrl', 'grave'],           # Ctrl+`
-                    ['ctrl', 'shift', 't'],      # Ctrl+Shift+T
-                    ['f1'],                      # F1可能触发帮助或命令面板
-                ]
-                
-                for shortcut in shortcuts:
+            if _IS_WINDOWS:
+                for shortcut in _TERMINAL_SHORTCUTS:
                     try:
                         logger.info(f"🔧 尝试快捷键: {'+'.join(shortcut)}")
-                        pyautogui.hotkey(*shortcut)
+                        await _pg(pyautogui.hotkey, *shortcut)
                         await asyncio.sleep(1.5)
                         
                         # 验证是否成功打开终端
@@ -956,31 +1347,32 @@ class AutomationController:
     async def click_cursor_terminal_area(self) -> bool:
         """点击CURSOR界面中的终端区域"""
         try:
-            # 获取屏幕尺寸
-            screen_width, screen_height = pyautogui.size()
-            
             # 在CURSOR中，终端通常位于底部区域
-            # 尝试点击一些可能的终端位置
-            terminal_positions = [
-                (screen_width * 0.5, screen_height * 0.8),   # 底部中央
-                (screen_width * 0.3, screen_height * 0.85),  # 底部左侧
-                (screen_width * 0.7, screen_height * 0.85),  # 底部右侧
-                (screen_width * 0.5, screen_height * 0.9),   # 更底部的位置
-            ]
+            # 尝试点击一些可能的终端位置（按屏幕尺寸计算后缓存，尺寸变化时重算）
+            screen_size = _screen_size()
+            if self._terminal_positions is None or self._terminal_positions_size != screen_size:
+                screen_width, screen_height = screen_size
+                self._terminal_positions_size = screen_size
+                self._terminal_positions = [
+                    (int(screen_width * 0.5), int(screen_height * 0.8)),   # 底部中央
+                    (int(screen_width * 0.3), int(screen_height * 0.85)),  # 底部左侧
+                    (int(screen_width * 0.7), int(screen_height * 0.85)),  # 底部右侧
+                    (int(screen_width * 0.5), int(screen_height * 0.9)),   # 更底部的位置
+                ]
             
-            for x, y in terminal_positions:
+            for x, y in self._terminal_positions:
                 try:
-                    logger.info(f"🎯 尝试点击终端位置: ({int(x)}, {int(y)})")
-                    pyautogui.click(int(x), int(y))
+                    logger.info(f"🎯 尝试点击终端位置: ({x}, {y})")
+                    await _pg(pyautogui.click, x, y)
                     await asyncio.sleep(1)
                     
                     # 验证是否激活了终端
                     if await self.verify_terminal_active():
-                        logger.info(f"✅ 成功激活终端区域: ({int(x)}, {int(y)})")
+                        logger.info(f"✅ 成功激活终端区域: ({x}, {y})")
                         return True
                         
                 except Exception as e:
-                    logger.debug(f"点击位置 ({int(x)}, {int(y)}) 失败: {e}")
+                    logger.debug(f"点击位置 ({x}, {y}) 失败: {e}")
                     continue
             
             return False
@@ -992,22 +1384,27 @@ class AutomationController:
     async def verify_terminal_active(self) -> bool:
         """验证终端是否处于活动状态"""
         try:
+            # Windows下先检查前台窗口类名，是终端窗口则无需按键探测
+            if _IS_WINDOWS and _foreground_class_name() in _TERMINAL_CLASS_NAMES:
+                logger.info("✅ 前台窗口为终端")
+                return True
+            
             # 尝试输入一个简单的测试字符并检查响应
             test_char = "echo test"
             
             # 清空当前行
-            pyautogui.hotkey('ctrl', 'c')  # 中断当前命令
-            await asyncio.sleep(0.2)
+            await self._send_and_wait_for_echo(lambda: pyautogui.hotkey('ctrl', 'c'), timeout=0.2)  # 中断当前命令
             
             # 输入测试命令但不执行
-            pyautogui.typewrite(test_char, interval=0.02)
-            await asyncio.sleep(0.3)
+            if _IS_WINDOWS:
+                send_probe = lambda: _send_text_batched(test_char) or self._insert_text(test_char)
+            else:
+                send_probe = lambda: pyautogui.typewrite(test_char, interval=0.02)
+            await self._send_and_wait_for_echo(send_probe, timeout=0.3)
             
             # 清空测试输入
-            pyautogui.hotkey('ctrl', 'a')
-            await asyncio.sleep(0.1)
-            pyautogui.press('delete')
-            await asyncio.sleep(0.2)
+            await self._send_and_wait_for_echo(lambda: pyautogui.hotkey('ctrl', 'a'), timeout=0.1)
+            await self._send_and_wait_for_echo(lambda: pyautogui.press('delete'), timeout=0.2)
             
             # 如果能够输入和删除，说明终端可能处于活动状态
             logger.info("✅ 终端响应测试通过")
@@ -1022,19 +1419,24 @@ class AutomationController:
         try:
             logger.info("🔧 准备终端输入状态...")
             
+            # Windows下一次SendInput发送全部准备按键
+            if _IS_WINDOWS:
+                sent = []
+                await self._send_and_wait_for_echo(lambda: sent.append(_send_input_array(_PREP_INPUTS)), timeout=0.3)
+                if sent[0]:
+                    logger.info("✅ 终端输入状态准备完成")
+                    return True
+                logger.debug("批量发送准备按键失败，逐个发送")
+            
             # 确保终端不在其他模式中
-            pyautogui.press('esc')  # 退出可能的模式
-            await asyncio.sleep(0.2)
+            await self._send_and_wait_for_echo(lambda: pyautogui.press('esc'), timeout=0.2)  # 退出可能的模式
             
             # 中断任何正在运行的命令
-            pyautogui.hotkey('ctrl', 'c')
-            await asyncio.sleep(0.3)
+            await self._send_and_wait_for_echo(lambda: pyautogui.hotkey('ctrl', 'c'), timeout=0.3)
             
             # 清空当前输入行
-            pyautogui.hotkey('ctrl', 'a')
-            await asyncio.sleep(0.1)
-            pyautogui.press('delete')
-            await asyncio.sleep(0.2)
+            await self._send_and_wait_for_echo(lambda: pyautogui.hotkey('ctrl', 'a'), timeout=0.1)
+            await self._send_and_wait_for_echo(lambda: pyautogui.press('delete'), timeout=0.2)
             
             logger.info("✅ 终端输入状态准备完成")
             return True
@@ -1046,30 +1448,8 @@ class AutomationController:
     async def detect_command_type(self, text: str) -> str:
         """检测文本类型：是命令还是聊天消息"""
         try:
-            # 常见的命令关键词
-            command_keywords = [
-                'pip', 'python', 'npm', 'node', 'git', 'cd', 'ls', 'dir',
-                'mkdir', 'rmdir', 'rm', 'cp', 'mv', 'cat', 'echo', 'curl',
-                'wget', 'chmod', 'chown', 'sudo', 'apt', 'yum', 'brew',
-                'docker', 'kubectl', 'terraform', 'ansible'
-            ]
-            
-            # 命令模式的特征
-            command_patterns = [
-                text.startswith('pip '),
-                text.startswith('python '),
-                text.startswith('npm '),
-                text.startswith('git '),
-                text.startswith('./'),
-                text.startswith('cd '),
-                any(keyword in text.lower() for keyword in command_keywords),
-                text.endswith('.py'),
-                text.endswith('.js'),
-                text.endswith('.sh'),
-            ]
-            
             # 如果匹配任何命令模式，返回'command'
-            if any(command_patterns):
+            if _COMMAND_RE.search(text):
                 logger.info(f"📋 检测为命令类型: {text[:50]}...")
                 return "command"
             else:
@@ -7,23 +7,149 @@ GPT控制器模块
 
 import asyncio
 import base64
+import copy
+import hashlib
 import json
 import logging
 import os
+import re
+import sqlite3
+import threading
 import time
-from typing import Dict, List, Optional, Any
-from openai import OpenAI  # 更改为同步客户端
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from typing import Dict, List, Optional, Any, Tuple
+from openai import AsyncOpenAI, APITimeoutError  # 异步客户端，网络请求不阻塞事件循环
 from PIL import Image
 import io
 
+# 优先使用orjson解析GPT返回的JSON，不可用时回退到标准库
+try:
+    import orjson
+    _loads = orjson.loads
+except ImportError:
+    _loads = json.loads
+
 logger = logging.getLogger(__name__)
 
+# 完成任务分析的系统提示词
+_COMPLETION_ANALYSIS_PROMPT = """
+你是一个具备主力操盘手思维的CURSOR IDE专家助手。现在需要分析一个刚刚完成的编程任务。
+
+从主力操盘手的角度，你需要：
+1. **反人性分析**: 识别完成内容中可能的"诱多"陷阱或过度乐观
+2. **深度价值评估**: 客观评估实际价值，避免被表面成功迷惑  
+3. **下一步策略**: 从操盘手角度建议最优后续行动
+4. **风险识别**: 指出可能被忽视的潜在问题
+
+请提供简洁的分析结果（不超过500字）：
+
+```json
+{
+    "action_type": "continue_conversation|provide_feedback|suggest_improvements|acknowledge_completion",
+    "master_analysis": "从主力操盘手角度的深度分析",
+    "value_assessment": "实际价值评估（避免被表面成功迷惑）",
+    "risk_identification": "潜在风险和陷阱识别",  
+    "next_strategy": "基于主力思维的下一步策略",
+    "confidence": 0.0-1.0,
+    "reasoning": "选择此行动的主力操盘手逻辑"
+}
+```
+
+重要原则：
+- 保持主力操盘手的冷静理性，不被表面成功冲昏头脑
+- 识别散户思维陷阱，提供反人性的深度见解
+- 关注长期战略价值，而非短期表面成果
+- 提供具体可行的后续行动建议
+"""
+
+# 产品导向的开发推进者系统提示词
+_PRODUCT_MANAGER_PROMPT = """
+你是一个专注于产品功能快速实现的开发推进者。你的使命是推动项目快速完成主要功能，避免陷入技术细节的无限优化。
+
+**核心原则：功能优先，细节后续**
+
+**你的任务**：
+1. 快速识别当前功能完成状态
+2. 立即推动下一个核心功能的开发
+3. 遇到问题时选择最简单直接的解决方案
+4. 避免过度优化和完美主义陷阱
+
+**推进策略**：
+- 当功能基本完成时：立即转向下一个功能
+- 遇到错误时：快速修复，不深究原理
+- 出现性能问题：先忽略，除非严重影响使用
+- 代码不够完美：先能用，后续迭代
+
+**回复模式**：
+- "很好！[功能名]已经基本能用了，现在我们立即开始下一个核心功能：[下一功能]"
+- "这个错误用最简单的方法解决：[简单方案]，然后继续推进主功能"
+- "当前进展不错，让我们专注于核心功能实现，细节优化留到后面"
+
+**绝对避免**：
+- 过度分析技术细节
+- 纠结于代码质量问题
+- 无限制的性能优化
+- 完美主义的重构需求
+
+**目标导向**：
+你的目标是让整个项目快速达到"能用"状态，形成完整的功能闭环，而不是打造完美的代码。
+
+**回复要求**：
+- 100-200字，直接推动下一步行动
+- 专注于功能实现进度
+- 保持高效快节奏
+- 体现产品思维而非技术思维
+"""
+
+# GPT响应中```json ... ```代码块
+_JSON_RE = re.compile(r'```json\s*(.*?)\s*```', re.DOTALL)
+
+# 操作指令缺失字段的默认值
+_ACTION_DEFAULTS = {
+    "action_type": "wait",
+    "target": "unknown",
+    "value": None,
+    "coordinates": None,
+    "confidence": 0.5,
+    "reasoning": "默认操作",
+    "follow_up_actions": []
+}
+
+# 完成分析缺失字段的默认值
+_COMPLETION_DEFAULTS = {
+    "action_type": "acknowledge_completion",
+    "master_analysis": "任务完成，需要从主力角度进一步分析",
+    "value_assessment": "初步评估显示任务已完成，需深入验证实际价值",
+    "risk_identification": "需要识别潜在风险和盲点",
+    "next_strategy": "建议进行实战测试以验证真实效果",
+    "confidence": 0.7,
+    "reasoning": "基于主力操盘手经验的保守判断",
+    "conversation_trigger": "建议主动对话以获取更多信息"
+}
+
+# 从文本描述推断操作类型的关键词（按优先级排列）
+_ACTION_KEYWORDS = {
+    "click": ("click", "点击"),
+    "type": ("type", "input", "输入"),
+    "key_press": ("press", "按键"),
+    "wait": ("wait", "等待"),
+}
+
+# 从文本形式的完成分析推断行动类型的关键词（按优先级排列）
+_COMPLETION_ACTION_KEYWORDS = {
+    "continue_conversation": ("继续对话", "continue", "discuss", "交流"),
+    "suggest_improvements": ("改进", "improve", "optimize", "enhance"),
+    "provide_feedback": ("反馈", "feedback", "评价"),
+}
+
 class GPTController:
     """GPT控制器类"""
     
     def __init__(self, api_key: str, base_url: Optional[str] = None):
         # 简化客户端初始化，只传递必要参数
-        client_kwargs = {"api_key": api_key}
+        client_kwargs = {"api_key": api_key, "timeout": 25}  # 25秒请求超时
         
         # 只有在base_url存在且有效时才添加
         if base_url and base_url.strip():
@@ -39,17 +165,36 @@ class GPTController:
             logger.info(f"使用自定义API base_url: {base_url}")
         
         try:
-            self.client = OpenAI(**client_kwargs)
+            self.client = AsyncOpenAI(**client_kwargs)
             logger.info("OpenAI客户端初始化成功")
         except Exception as e:
             logger.error(f"OpenAI客户端初始化失败: {e}")
             # 尝试不使用base_url的基础初始化
-            self.client = OpenAI(api_key=api_key)
+            self.client = AsyncOpenAI(api_key=api_key, timeout=25)
             logger.info("使用基础API地址初始化")
             
-        self.conversation_history = []
-        self.analysis_cache = {}
         self.max_history_length = 10
+        self.conversation_history = deque(maxlen=self.max_history_length)  # 超出长度自动丢弃最旧记录
+        # 分析结果缓存：(截图dHash, 上下文sha1) -> (时间戳, 结果)，LRU淘汰
+        self.analysis_cache: "OrderedDict[Tuple[int, str], Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self.analysis_cache_ttl = 30.0  # 秒
+        self.max_cache_size = 128
+        self.cache_hamming_threshold = 5  # dHash汉明距离不超过此值视为相同画面
+        self._b64_cache: Optional[Tuple[Image.Image, int, str]] = None  # 最近一次编码的截图（持有引用，避免id复用）
+        
+        # 完成任务分析API失败后的冷却期，期间直接返回备用分析，不再编码截图和请求
+        self._last_api_failure_ts = 0.0
+        self.api_failure_cooldown = 30.0  # 秒
+        
+        # 分析缓存持久化到SQLite，重启后可复用之前会话的分析结果（相同画面和上下文）
+        self.cache_db_path = os.path.join("cache", "gpt_analysis_cache.db")
+        self.persistent_cache_ttl = 3600.0  # 秒
+        self.max_persistent_cache_size = 1000
+        self._session_start = time.time()
+        self._cache_db_lock = threading.Lock()
+        # 写入（含提交）放到单个后台线程按顺序执行，不在事件循环上等待磁盘同步
+        self._cache_db_writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="gpt-cache-db")
+        self._cache_db = self._open_cache_db()
         
         # 系统提示词 - 专注于项目功能完成的产品导向
         self.system_prompt = """
@@ -109,19 +254,30 @@ class GPTController:
 
 **记住：我们的目标是快速搭建起整个程序并确保能用，细节优化留到后面！**
 """
+        
+        # 固定的系统消息只构建一次，各分析方法按引用复用
+        # 附加说明放在第二条系统消息中，使第一条消息在各请求间完全一致，便于命中服务端提示词缓存
+        self._sys_msg = {"role": "system", "content": self.system_prompt}
+        self._sys_msg_error = {"role": "system", "content": "特别注意：这是一个错误分析请求，请重点关注错误修复。"}
+        self._sys_msg_completion = {"role": "system", "content": _COMPLETION_ANALYSIS_PROMPT}
+        self._sys_msg_product_manager = {"role": "system", "content": _PRODUCT_MANAGER_PROMPT}
     
-    def analyze_situation(self, screenshot: Image.Image, context: str) -> Dict[str, Any]:
+    async def analyze_situation(self, screenshot: Image.Image, context: str) -> Dict[str, Any]:
         """分析当前情况并生成操作指令"""
         try:
+            # 画面和上下文都未变化时直接复用上次分析结果
+            cache_key = self._cache_key(screenshot, f"situation:{context}")
+            cached = await self._get_cached_analysis(cache_key)
+            if cached is not None:
+                logger.info("♻️ 画面未变化，复用缓存的GPT分析结果")
+                return cached
+            
             # 将截图转换为base64
-            screenshot_base64 = self.image_to_base64(screenshot)
+            screenshot_base64 = self._b64(screenshot)
             
             # 构建消息
             messages = [
-                {
-                    "role": "system", 
-                    "content": self.system_prompt
-                },
+                self._sys_msg,
                 {
                     "role": "user",
                     "content": [
@@ -132,8 +288,8 @@ class GPTController:
                         {
                             "type": "image_url",
                             "image_url": {
-                                "url": f"data:image/png;base64,{screenshot_base64}",
-                                "detail": "high"
+                                "url": f"data:image/jpeg;base64,{screenshot_base64}",
+                                "detail": "low"
                             }
                         }
                     ]
@@ -141,10 +297,11 @@ class GPTController:
             ]
             
             # 添加对话历史（最近几轮）
-            messages.extend(self.conversation_history[-4:])
+            history = self.conversation_history
+            messages.extend(islice(history, max(0, len(history) - 4), None))
             
             # 调用GPT-4O
-            response = self.client.chat.completions.create(
+            response_text = await self._complete_until_json(
                 model="gpt-4o",
                 messages=messages,
                 max_tokens=1000,
@@ -152,7 +309,6 @@ class GPTController:
             )
             
             # 解析响应
-            response_text = response.choices[0].message.content
             logger.info(f"GPT分析结果: {response_text[:200]}...")
             
             # 尝试提取JSON操作指令
@@ -161,12 +317,14 @@ class GPTController:
             # 更新对话历史
             self.update_conversation_history(context, response_text)
             
-            return {
+            result = {
                 "analysis": response_text,
                 "action": action_data,
                 "timestamp": time.time(),
                 "context": context
             }
+            self._store_cached_analysis(cache_key, result)
+            return result
             
         except Exception as e:
             logger.error(f"GPT分析时出错: {e}")
@@ -183,17 +341,34 @@ class GPTController:
                 "context": context
             }
     
+    async def _complete_until_json(self, **request) -> str:
+        """流式获取回复，JSON代码块一闭合就停止接收，省去其后的token生成时间"""
+        stream = await self.client.chat.completions.create(stream=True, **request)
+        parts = []
+        try:
+            async for chunk in stream:
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content
+                if not delta:
+                    continue
+                parts.append(delta)
+                # 只有收到反引号时才可能刚闭合代码块
+                if '`' in delta and _JSON_RE.search(''.join(parts)):
+                    break
+        finally:
+            await stream.close()
+        return ''.join(parts)
+    
     def extract_action_from_response(self, response_text: str) -> Dict[str, Any]:
         """从GPT响应中提取操作指令"""
         try:
             # 尝试找到JSON块
-            import re
-            json_pattern = r'```json\s*(.*?)\s*```'
-            json_match = re.search(json_pattern, response_text, re.DOTALL)
+            json_match = _JSON_RE.search(response_text)
             
             if json_match:
                 json_str = json_match.group(1)
-                action_data = json.loads(json_str)
+                action_data = _loads(json_str)
                 
                 # 验证必要字段
                 required_fields = ["action_type", "confidence", "reasoning"]
@@ -220,16 +395,11 @@ class GPTController:
         text_lower = text.lower()
         
         # 识别操作类型
-        if any(keyword in text_lower for keyword in ["click", "点击"]):
-            action_type = "click"
-        elif any(keyword in text_lower for keyword in ["type", "input", "输入"]):
-            action_type = "type"
-        elif any(keyword in text_lower for keyword in ["press", "按键"]):
-            action_type = "key_press"
-        elif any(keyword in text_lower for keyword in ["wait", "等待"]):
-            action_type = "wait"
-        else:
-            action_type = "analyze"
+        action_type = next(
+            (action for action, keywords in _ACTION_KEYWORDS.items()
+             if any(keyword in text_lower for keyword in keywords)),
+            "analyze"
+        )
         
         return {
             "action_type": action_type,
@@ -240,22 +410,150 @@ class GPTController:
     
     def get_default_value(self, field: str) -> Any:
         """获取字段的默认值"""
-        defaults = {
-            "action_type": "wait",
-            "target": "unknown",
-            "value": None,
-            "coordinates": None,
-            "confidence": 0.5,
-            "reasoning": "默认操作",
-            "follow_up_actions": []
-        }
-        return defaults.get(field, None)
+        value = _ACTION_DEFAULTS.get(field)
+        # 可变默认值返回副本，避免调用方修改共享的默认值
+        return list(value) if isinstance(value, list) else value
+    
+    @staticmethod
+    def _screenshot_dhash(screenshot: Image.Image) -> int:
+        """计算截图的64位差值哈希（9x8灰度缩略图中相邻像素比较）"""
+        pixels = list(screenshot.resize((9, 8), Image.BILINEAR).convert('L').getdata())
+        bits = 0
+        for row in range(0, 72, 9):
+            for col in range(row, row + 8):
+                bits = (bits << 1) | (pixels[col] > pixels[col + 1])
+        return bits
+    
+    def _cache_key(self, screenshot: Image.Image, context: str) -> Tuple[int, str]:
+        """缓存键：截图感知哈希 + 上下文摘要"""
+        return self._screenshot_dhash(screenshot), hashlib.sha1(context.encode('utf-8')).hexdigest()
+    
+    async def _get_cached_analysis(self, key: Tuple[int, str]) -> Optional[Dict[str, Any]]:
+        """查找未过期的缓存结果，画面近似（汉明距离很小）也视为命中；内存未命中时在数据库线程查询持久化结果"""
+        now = time.time()
+        entry = self.analysis_cache.get(key)
+        if entry is None:
+            dhash, context_hash = key
+            for cached_key, cached_entry in self.analysis_cache.items():
+                if (cached_key[1] == context_hash and
+                        (cached_key[0] ^ dhash).bit_count() <= self.cache_hamming_threshold):
+                    key, entry = cached_key, cached_entry
+                    break
+            else:
+                if self._cache_db is None:
+                    return None
+                loop = asyncio.get_running_loop()
+                result = await loop.run_in_executor(self._cache_db_writer, self._load_persisted_analysis, key, now)
+                if result is not None:
+                    self._remember_analysis(key, result, now)
+                    result = copy.deepcopy(result)
+                return result
+        
+        timestamp, result = entry
+        if now - timestamp > self.analysis_cache_ttl:
+            del self.analysis_cache[key]
+            return None
+        
+        self.analysis_cache.move_to_end(key)
+        # 返回副本，调用方修改结果（如action字典）不会污染缓存
+        return copy.deepcopy(result)
+    
+    def _store_cached_analysis(self, key: Tuple[int, str], result: Dict[str, Any], persist: bool = True):
+        """写入缓存并按LRU淘汰；persist为False时只进内存（操作建议类结果不跨会话复用）"""
+        now = time.time()
+        self._remember_analysis(key, result, now)
+        if persist and self._cache_db is not None:
+            # 在当前线程序列化，避免调用方随后修改结果字典时与后台线程竞争
+            payload = json.dumps(result, ensure_ascii=False)
+            self._cache_db_writer.submit(self._persist_analysis, key, payload, now)
+    
+    def _remember_analysis(self, key: Tuple[int, str], result: Dict[str, Any], timestamp: float):
+        """写入内存缓存并按LRU淘汰"""
+        self.analysis_cache[key] = (timestamp, result)
+        self.analysis_cache.move_to_end(key)
+        while len(self.analysis_cache) > self.max_cache_size:
+            self.analysis_cache.popitem(last=False)
+    
+    def _open_cache_db(self) -> Optional[sqlite3.Connection]:
+        """打开持久化缓存数据库并清理过期记录，失败时只使用内存缓存"""
+        try:
+            os.makedirs(os.path.dirname(self.cache_db_path), exist_ok=True)
+            conn = sqlite3.connect(self.cache_db_path, check_same_thread=False)
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS analysis_cache ("
+                "dhash TEXT, context_hash TEXT, ts REAL, payload TEXT, "
+                "PRIMARY KEY (dhash, context_hash))"
+            )
+            conn.execute("DELETE FROM analysis_cache WHERE ts < ?", (time.time() - self.persistent_cache_ttl,))
+            conn.commit()
+            return conn
+        except Exception as e:
+            logger.warning(f"⚠️ 分析缓存数据库不可用，仅使用内存缓存: {e}")
+            return None
+    
+    def _load_persisted_analysis(self, key: Tuple[int, str], now: float) -> Optional[Dict[str, Any]]:
+        """查找之前会话持久化的结果（在数据库线程中执行，本次会话内仍以内存缓存的TTL为准）"""
+        if self._cache_db is None:
+            return None
+        try:
+            with self._cache_db_lock:
+                row = self._cache_db.execute(
+                    "SELECT ts, payload FROM analysis_cache WHERE dhash = ? AND context_hash = ? AND ts < ?",
+                    (format(key[0], '016x'), key[1], self._session_start)
+                ).fetchone()
+            if row is None or now - row[0] > self.persistent_cache_ttl:
+                return None
+            return _loads(row[1])
+        except Exception as e:
+            logger.debug(f"读取持久化分析缓存失败: {e}")
+            return None
     
-    def image_to_base64(self, image: Image.Image) -> str:
-        """将PIL图像转换为base64字符串"""
+    def _persist_analysis(self, key: Tuple[int, str], payload: str, timestamp: float):
+        """写入持久化缓存并限制记录数（在后台写入线程中执行）"""
+        if self._cache_db is None:
+            return
         try:
+            with self._cache_db_lock:
+                self._cache_db.execute(
+                    "INSERT OR REPLACE INTO analysis_cache (dhash, context_hash, ts, payload) VALUES (?, ?, ?, ?)",
+                    (format(key[0], '016x'), key[1], timestamp, payload)
+                )
+                self._cache_db.execute(
+                    "DELETE FROM analysis_cache WHERE rowid NOT IN "
+                    "(SELECT rowid FROM analysis_cache ORDER BY ts DESC LIMIT ?)",
+                    (self.max_persistent_cache_size,)
+                )
+                self._cache_db.commit()
+        except Exception as e:
+            logger.debug(f"写入持久化分析缓存失败: {e}")
+    
+    @staticmethod
+    def _prep(image: Image.Image, max_side: int = 768) -> Image.Image:
+        """按最长边等比缩小图像，减少视觉token和传输字节"""
+        width, height = image.size
+        scale = min(1.0, max_side / max(width, height))
+        if scale == 1.0:
+            return image
+        return image.resize((int(width * scale), int(height * scale)), Image.BILINEAR)
+    
+    def _b64(self, image: Image.Image, max_side: int = 768) -> str:
+        """同一截图对象被多个分析方法使用时只编码一次"""
+        cached = self._b64_cache
+        if cached is not None and cached[0] is image and cached[1] == max_side:
+            return cached[2]
+        encoded = self.image_to_base64(image, max_side)
+        if encoded:
+            self._b64_cache = (image, max_side, encoded)
+        return encoded
+    
+    def image_to_base64(self, image: Image.Image, max_side: int = 768) -> str:
+        """将PIL图像转换为base64字符串（先缩小到max_side以内，JPEG q=80，比PNG编码更快、体积更小）"""
+        try:
+            image = self._prep(image, max_side)
             buffer = io.BytesIO()
-            image.save(buffer, format='PNG')
+            if image.mode != 'RGB':
+                image = image.convert('RGB')
+            image.save(buffer, format='JPEG', quality=80, subsampling=2)
             img_base64 = base64.b64encode(buffer.getvalue()).decode()
             return img_base64
         except Exception as e:
@@ -268,20 +566,14 @@ class GPTController:
             "role": "assistant",
             "content": response
         })
-        
-        # 保持历史长度限制
-        if len(self.conversation_history) > self.max_history_length:
-            self.conversation_history = self.conversation_history[-self.max_history_length:]
     
-    def analyze_error(self, screenshot: Image.Image, error_text: str) -> Dict[str, Any]:
+    async def analyze_error(self, screenshot: Image.Image, error_text: str) -> Dict[str, Any]:
         """专门分析错误情况"""
         context = f"CURSOR出现错误，错误信息：{error_text}"
         
         messages = [
-            {
-                "role": "system",
-                "content": self.system_prompt + "\n\n特别注意：这是一个错误分析请求，请重点关注错误修复。"
-            },
+            self._sys_msg,
+            self._sys_msg_error,
             {
                 "role": "user",
                 "content": [
@@ -292,8 +584,8 @@ class GPTController:
                     {
                         "type": "image_url",
                         "image_url": {
-                            "url": f"data:image/png;base64,{self.image_to_base64(screenshot)}",
-                            "detail": "high"
+                            "url": f"data:image/jpeg;base64,{self._b64(screenshot, max_side=2048)}",
+                            "detail": "high"  # 错误分析需要看清错误文本，保留高细节
                         }
                     }
                 ]
@@ -301,14 +593,13 @@ class GPTController:
         ]
         
         try:
-            response = self.client.chat.completions.create(
+            response_text = await self._complete_until_json(
                 model="gpt-4o",
                 messages=messages,
                 max_tokens=1200,
                 temperature=0.1
             )
             
-            response_text = response.choices[0].message.content
             action_data = self.extract_action_from_response(response_text)
             
             return {
@@ -329,14 +620,23 @@ class GPTController:
                 "timestamp": time.time()
             }
     
-    def suggest_continuation(self, screenshot: Image.Image, stuck_duration: int) -> Dict[str, Any]:
+    async def suggest_continuation(self, screenshot: Image.Image, stuck_duration: int,
+                                   screen_text: str = "") -> Dict[str, Any]:
         """为卡住的情况提供建议"""
         context = f"CURSOR已经卡住 {stuck_duration} 秒，需要干预"
         
+        # 卡住期间会反复轮询，画面和识别文本都不变时复用缓存（键不含卡住时长，否则每次都不同）
+        cache_key = self._cache_key(screenshot, f"suggest_continuation:{screen_text}")
+        cached = await self._get_cached_analysis(cache_key)
+        if cached is not None:
+            logger.info("♻️ 画面未变化，复用缓存的卡住状态建议")
+            return cached
+        
         messages = [
+            self._sys_msg,
             {
                 "role": "system",
-                "content": self.system_prompt + f"\n\n特别注意：CURSOR已经卡住了{stuck_duration}秒，需要采取行动让它继续工作。"
+                "content": f"特别注意：CURSOR已经卡住了{stuck_duration}秒，需要采取行动让它继续工作。"
             },
             {
                 "role": "user",
@@ -348,8 +648,8 @@ class GPTController:
                     {
                         "type": "image_url",
                         "image_url": {
-                            "url": f"data:image/png;base64,{self.image_to_base64(screenshot)}",
-                            "detail": "high"
+                            "url": f"data:image/jpeg;base64,{self._b64(screenshot)}",
+                            "detail": "low"
                         }
                     }
                 ]
@@ -357,22 +657,23 @@ class GPTController:
         ]
         
         try:
-            response = self.client.chat.completions.create(
+            response_text = await self._complete_until_json(
                 model="gpt-4o",
                 messages=messages,
                 max_tokens=1000,
                 temperature=0.2
             )
             
-            response_text = response.choices[0].message.content
             action_data = self.extract_action_from_response(response_text)
             
-            return {
+            result = {
                 "analysis": response_text,
                 "action": action_data,
                 "stuck_duration": stuck_duration,
                 "timestamp": time.time()
             }
+            self._store_cached_analysis(cache_key, result, persist=False)
+            return result
             
         except Exception as e:
             logger.error(f"卡住状态分析时出错: {e}")
@@ -386,6 +687,17 @@ class GPTController:
                 "timestamp": time.time()
             }
     
+    async def cleanup(self):
+        """清理资源：等待后台写入完成后关闭缓存数据库"""
+        try:
+            await asyncio.to_thread(self._cache_db_writer.shutdown, wait=True)
+            if self._cache_db is not None:
+                with self._cache_db_lock:
+                    self._cache_db.close()
+                self._cache_db = None
+        except Exception as e:
+            logger.error(f"清理GPTController资源时出错: {e}")
+    
     def clear_conversation_history(self):
         """清空对话历史"""
         self.conversation_history.clear()
@@ -399,50 +711,22 @@ class GPTController:
             "last_analysis_time": getattr(self, 'last_analysis_time', 0)
         }
     
-    def analyze_completed_task(self, screenshot: Image.Image, completed_text: str, context: str) -> Dict[str, Any]:
+    async def analyze_completed_task(self, screenshot: Image.Image, completed_text: str, context: str) -> Dict[str, Any]:
         """专门分析完成的任务内容，从主力操盘手角度提供深度分析和建议"""
         try:
             logger.info("🔍 开始GPT完成任务分析...")
-            # 将截图转换为base64
-            screenshot_base64 = self.image_to_base64(screenshot)
             
-            # 构建专门针对完成任务的系统提示词
-            completion_analysis_prompt = """
-你是一个具备主力操盘手思维的CURSOR IDE专家助手。现在需要分析一个刚刚完成的编程任务。
-
-从主力操盘手的角度，你需要：
-1. **反人性分析**: 识别完成内容中可能的"诱多"陷阱或过度乐观
-2. **深度价值评估**: 客观评估实际价值，避免被表面成功迷惑  
-3. **下一步策略**: 从操盘手角度建议最优后续行动
-4. **风险识别**: 指出可能被忽视的潜在问题
-
-请提供简洁的分析结果（不超过500字）：
-
-```json
-{
-    "action_type": "continue_conversation|provide_feedback|suggest_improvements|acknowledge_completion",
-    "master_analysis": "从主力操盘手角度的深度分析",
-    "value_assessment": "实际价值评估（避免被表面成功迷惑）",
-    "risk_identification": "潜在风险和陷阱识别",  
-    "next_strategy": "基于主力思维的下一步策略",
-    "confidence": 0.0-1.0,
-    "reasoning": "选择此行动的主力操盘手逻辑"
-}
-```
-
-重要原则：
-- 保持主力操盘手的冷静理性，不被表面成功冲昏头脑
-- 识别散户思维陷阱，提供反人性的深度见解
-- 关注长期战略价值，而非短期表面成果
-- 提供具体可行的后续行动建议
-"""
+            # API刚失败过时直接使用备用分析，跳过截图编码
+            if time.time() - self._last_api_failure_ts < self.api_failure_cooldown:
+                logger.warning("⏳ GPT API近期调用失败，冷却期内使用本地备用分析")
+                return self._get_api_error_fallback_analysis(context, completed_text, "API冷却中")
+            
+            # 将截图转换为base64
+            screenshot_base64 = self._b64(screenshot)
             
             # 构建消息
             messages = [
-                {
-                    "role": "system", 
-                    "content": completion_analysis_prompt
-                },
+                self._sys_msg_completion,
                 {
                     "role": "user",
                     "content": [
@@ -459,7 +743,7 @@ class GPTController:
                         {
                             "type": "image_url",
                             "image_url": {
-                                "url": f"data:image/png;base64,{screenshot_base64}",
+                                "url": f"data:image/jpeg;base64,{screenshot_base64}",
                                 "detail": "low"  # 降低图像细节以加快处理
                             }
                         }
@@ -469,74 +753,29 @@ class GPTController:
             
             logger.info("📡 发送GPT API请求...")
             
-            # 添加超时设置的API调用（Windows兼容版本）
-            import signal
-            import functools
-            import threading
-            import platform
-            
-            timeout_occurred = False
-            timer = None
-            
-            def timeout_handler():
-                nonlocal timeout_occurred
-                timeout_occurred = True
-                logger.warning("⏰ GPT API调用超时（30秒）")
-            
-            # Windows系统兼容的超时处理
-            if platform.system() == "Windows":
-                # 在Windows上使用Timer
-                timer = threading.Timer(30.0, timeout_handler)
-                timer.start()
-            else:
-                # 在Unix系统上使用SIGALRM
-                def signal_timeout_handler(signum, frame):
-                    raise TimeoutError("GPT API调用超时")
-                signal.signal(signal.SIGALRM, signal_timeout_handler)
-                signal.alarm(30)
-            
             try:
-                # 调用GPT-4O进行专门的完成任务分析
-                response = self.client.chat.completions.create(
-                    model="gpt-4o",
-                    messages=messages,
-                    max_tokens=800,  # 减少token数量加快响应
-                    temperature=0.2,  # 更低温度以获得更理性的分析
-                    timeout=25  # 25秒超时
+                # 调用GPT-4O进行专门的完成任务分析（客户端25秒请求超时，外层30秒兜底）
+                response_text = await asyncio.wait_for(
+                    self._complete_until_json(
+                        model="gpt-4o",
+                        messages=messages,
+                        max_tokens=800,  # 减少token数量加快响应
+                        temperature=0.2  # 更低温度以获得更理性的分析
+                    ),
+                    timeout=30
                 )
-                
-                # 取消超时
-                if timer:
-                    timer.cancel()
-                elif platform.system() != "Windows":
-                    signal.alarm(0)
-                
-                # 检查是否超时
-                if timeout_occurred:
-                    logger.error("⏰ GPT API调用超时（30秒）")
-                    return self._get_timeout_fallback_analysis(context, completed_text)
-                
                 logger.info("✅ GPT API响应成功")
                 
-            except TimeoutError:
-                # 取消超时
-                if timer:
-                    timer.cancel()
-                elif platform.system() != "Windows":
-                    signal.alarm(0)
+            except (asyncio.TimeoutError, APITimeoutError):
+                self._last_api_failure_ts = time.time()
                 logger.error("⏰ GPT API调用超时（30秒）")
                 return self._get_timeout_fallback_analysis(context, completed_text)
             except Exception as api_error:
-                # 取消超时
-                if timer:
-                    timer.cancel()
-                elif platform.system() != "Windows":
-                    signal.alarm(0)
+                self._last_api_failure_ts = time.time()
                 logger.error(f"❌ GPT API调用失败: {api_error}")
                 return self._get_api_error_fallback_analysis(context, completed_text, str(api_error))
             
             # 解析响应
-            response_text = response.choices[0].message.content
             logger.info(f"📝 GPT完成任务分析: {response_text[:300]}...")
             
             # 尝试提取JSON分析结果
@@ -619,13 +858,11 @@ class GPTController:
         """从GPT响应中提取完成任务分析结果"""
         try:
             # 尝试找到JSON块
-            import re
-            json_pattern = r'```json\s*(.*?)\s*```'
-            json_match = re.search(json_pattern, response_text, re.DOTALL)
+            json_match = _JSON_RE.search(response_text)
             
             if json_match:
                 json_str = json_match.group(1)
-                analysis_data = json.loads(json_str)
+                analysis_data = _loads(json_str)
                 
                 # 验证必要字段
                 required_fields = ["action_type", "confidence", "reasoning"]
@@ -652,14 +889,11 @@ class GPTController:
         text_lower = text.lower()
         
         # 识别行动类型
-        if any(keyword in text_lower for keyword in ["继续对话", "continue", "discuss", "交流"]):
-            action_type = "continue_conversation"
-        elif any(keyword in text_lower for keyword in ["改进", "improve", "optimize", "enhance"]):
-            action_type = "suggest_improvements"
-        elif any(keyword in text_lower for keyword in ["反馈", "feedback", "评价"]):
-            action_type = "provide_feedback"
-        else:
-            action_type = "acknowledge_completion"
+        action_type = next(
+            (action for action, keywords in _COMPLETION_ACTION_KEYWORDS.items()
+             if any(keyword in text_lower for keyword in keywords)),
+            "acknowledge_completion"
+        )
         
         return {
             "action_type": action_type,
@@ -670,22 +904,12 @@ class GPTController:
     
     def get_completion_default_value(self, field: str) -> Any:
         """获取完成分析字段的默认值"""
-        defaults = {
-            "action_type": "acknowledge_completion",
-            "master_analysis": "任务完成，需要从主力角度进一步分析",
-            "value_assessment": "初步评估显示任务已完成，需深入验证实际价值",
-            "risk_identification": "需要识别潜在风险和盲点",
-            "next_strategy": "建议进行实战测试以验证真实效果",
-            "confidence": 0.7,
-            "reasoning": "基于主力操盘手经验的保守判断",
-            "conversation_trigger": "建议主动对话以获取更多信息"
-        }
-        return defaults.get(field, None)
+        return _COMPLETION_DEFAULTS.get(field)
     
     async def analyze_cursor_state(self, screenshot: Image.Image, extracted_text: str, context: str = "") -> Dict[str, Any]:
         """异步分析CURSOR状态 - 保持向后兼容性"""
         try:
-            return self.analyze_situation(screenshot, f"{context}\n当前文本内容: {extracted_text}")
+            return await self.analyze_situation(screenshot, f"{context}\n当前文本内容: {extracted_text}")
         except Exception as e:
             logger.error(f"异步CURSOR状态分析失败: {e}")
             return {
@@ -697,52 +921,17 @@ class GPTController:
                 }
             }
 
-    def analyze_as_product_manager(self, screenshot: Image.Image, cursor_reply: str, 
+    async def analyze_multi(self, screenshot: Image.Image, contexts: List[str]) -> List[Dict[str, Any]]:
+        """对同一截图按多个上下文并发分析（截图只编码一次，总耗时约等于最慢的一次请求）"""
+        return await asyncio.gather(*(self.analyze_situation(screenshot, context) for context in contexts))
+
+    async def analyze_as_product_manager(self, screenshot: Image.Image, cursor_reply: str, 
                                  project_context: str, conversation_history: str, 
                                  current_stage: str) -> str:
         """作为产品经理分析CURSOR回复并生成对话回复"""
         try:
-            # 产品导向的开发推进者系统提示词
-            product_manager_prompt = """
-你是一个专注于产品功能快速实现的开发推进者。你的使命是推动项目快速完成主要功能，避免陷入技术细节的无限优化。
-
-**核心原则：功能优先，细节后续**
-
-**你的任务**：
-1. 快速识别当前功能完成状态
-2. 立即推动下一个核心功能的开发
-3. 遇到问题时选择最简单直接的解决方案
-4. 避免过度优化和完美主义陷阱
-
-**推进策略**：
-- 当功能基本完成时：立即转向下一个功能
-- 遇到错误时：快速修复，不深究原理
-- 出现性能问题：先忽略，除非严重影响使用
-- 代码不够完美：先能用，后续迭代
-
-**回复模式**：
-- "很好！[功能名]已经基本能用了，现在我们立即开始下一个核心功能：[下一功能]"
-- "这个错误用最简单的方法解决：[简单方案]，然后继续推进主功能"
-- "当前进展不错，让我们专注于核心功能实现，细节优化留到后面"
-
-**绝对避免**：
-- 过度分析技术细节
-- 纠结于代码质量问题
-- 无限制的性能优化
-- 完美主义的重构需求
-
-**目标导向**：
-你的目标是让整个项目快速达到"能用"状态，形成完整的功能闭环，而不是打造完美的代码。
-
-**回复要求**：
-- 100-200字，直接推动下一步行动
-- 专注于功能实现进度
-- 保持高效快节奏
-- 体现产品思维而非技术思维
-"""
-
             # 将截图转换为base64
-            screenshot_base64 = self.image_to_base64(screenshot)
+            screenshot_base64 = self._b64(screenshot)
             
             # 检查cursor_reply中是否包含GPT_VISION_REQUIRED标记
             vision_images = []
@@ -762,7 +951,7 @@ class GPTController:
                                 # 读取图片并转换为base64
                                 from PIL import Image as PILImage
                                 region_image = PILImage.open(image_path)
-                                region_base64 = self.image_to_base64(region_image)
+                                region_base64 = self.image_to_base64(region_image, max_side=2048)
                                 vision_images.append(region_base64)
                                 processed_lines.append(f"[区域图片] OCR识别失败，已提供图片供视觉分析")
                                 logger.info(f"✅ 已添加区域图片到GPT-4O视觉分析: {image_path}")
@@ -813,8 +1002,8 @@ class GPTController:
                 {
                     "type": "image_url",
                     "image_url": {
-                        "url": f"data:image/png;base64,{screenshot_base64}",
-                        "detail": "high"
+                        "url": f"data:image/jpeg;base64,{screenshot_base64}",
+                        "detail": "low"
                     }
                 }
             ]
@@ -824,17 +1013,14 @@ class GPTController:
                 user_content.append({
                     "type": "image_url",
                     "image_url": {
-                        "url": f"data:image/png;base64,{region_base64}",
+                        "url": f"data:image/jpeg;base64,{region_base64}",
                         "detail": "high"
                     }
                 })
             
             # 构建消息
             messages = [
-                {
-                    "role": "system",
-                    "content": product_manager_prompt
-                },
+                self._sys_msg_product_manager,
                 {
                     "role": "user",
                     "content": user_content
@@ -842,7 +1028,7 @@ class GPTController:
             ]
             
             # 调用GPT-4O
-            response = self.client.chat.completions.create(
+            response = await self.client.chat.completions.create(
                 model="gpt-4o",
                 messages=messages,
                 max_tokens=600,  # 增加token限制以支持更详细的技术回复
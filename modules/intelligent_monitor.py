@@ -10,17 +10,209 @@ import time
 import asyncio
 import logging
 import hashlib
-from typing import Dict, Any, List, Optional
-from collections import deque
+import re
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List, Optional, Tuple
+from collections import deque, OrderedDict
 from PIL import Image
+import numpy as np
 from modules.window_selector import WindowSelector
 import pyautogui
 
+# 内容指纹只用于变化检测，优先使用非加密的xxhash，不可用时回退到blake2b
+try:
+    import xxhash
+
+    def _fingerprint(data: bytes) -> int:
+        return xxhash.xxh3_64_intdigest(data)
+except ImportError:
+    def _fingerprint(data: bytes) -> int:
+        return int.from_bytes(hashlib.blake2b(data, digest_size=8).digest(), 'big')
+
+# 尝试导入MSS截屏库（按区域直接截屏，不可用时回退到pyautogui）
+MSS_AVAILABLE = False
+
+try:
+    import mss
+    MSS_AVAILABLE = True
+except ImportError:
+    pass
+
+# 尝试导入BetterCam（DXGI桌面复制，后台持续截屏，仅Windows可用）
+BETTERCAM_AVAILABLE = False
+
+try:
+    import bettercam
+    BETTERCAM_AVAILABLE = True
+except ImportError:
+    pass
+
 logger = logging.getLogger(__name__)
 
+
+def _keyword_regex(keywords) -> re.Pattern:
+    """将关键词列表编译为单个子串匹配正则，一次扫描代替逐词查找"""
+    return re.compile('|'.join(map(re.escape, keywords)))
+
+
+# 严重错误关键词（优先级高）
+_CRITICAL_ERRORS = (
+    "fatal error", "critical error", "system error", "crash",
+    "致命错误", "严重错误", "系统错误", "崩溃"
+)
+
+# 一般错误关键词（需要上下文判断）
+_GENERAL_ERRORS = ("error", "错误", "失败", "exception", "traceback", "failed")
+
+# 扩展排除的上下文（这些情况下的错误关键词不算真正错误）
+_EXCLUDE_CONTEXTS = (
+    # 错误处理相关
+    "error handling", "error message", "error code", "error log",
+    "try catch", "exception handling", "error prevention",
+    "错误处理", "错误信息", "错误代码", "错误日志", "异常处理",
+    
+    # 开发调试相关
+    "debug", "test", "example", "示例", "测试", "调试",
+    
+    # 终端和系统输出相关
+    "powershell", "cmd", "terminal", "console", "shell",
+    "categoryinfo", "parsererror", "commandnotfound",
+    "fullyqualifiedid", "itemnotfound", "objectnotfound",
+    "parentcontains", "标记", "不是", "版本", "有效", "语句分隔符",
+    
+    # 日志和监控相关
+    "log", "info", "warning", "监控", "检测", "分析",
+    "cursor", "supervisor", "monitor", "智能", "状态",
+    
+    # OCR识别错误相关
+    "ocr", "识别", "文本", "字符", "内容", "预览"
+)
+
+# 系统/终端特征词汇
+_SYSTEM_INDICATORS = (
+    "ps ", "c:\\", "d:\\", "所在位置", "行:", "字符:", 
+    "cmdlet", "function", "script", "程序", "路径",
+    "拼写", "确保", "再试一次", "无法", "识别", "找不到"
+)
+
+# 代码审查和任务完成状态关键词
+_REVIEW_KEYWORDS = (
+    "review changes", "code review", "ready for review", 
+    "changes ready", "implementation complete", "代码审查", 
+    "请审查", "已完成实现", "review", "changes"
+)
+
+# 运行状态关键词
+_RUNNING_KEYWORDS = ("running", "执行中", "processing", "loading", "正在", "generating", "thinking")
+
+# 完成状态关键词
+_COMPLETION_KEYWORDS = ("completed", "完成", "success", "successfully", "✅", "🎉", "done", "finished")
+
+# 强完成信号
+_STRONG_SIGNALS = (
+    ("🎉", "celebration_emoji", 0.95),
+    ("✅", "checkmark_emoji", 0.9),
+    ("completed successfully", "completion_text", 0.9),
+    ("任务完成", "task_completion_chinese", 0.9),
+    ("execution finished", "execution_completion", 0.85),
+    ("build successful", "build_completion", 0.85),
+    # 新增：代码审查和任务交付相关信号
+    ("review changes", "review_changes", 0.9),
+    ("code review", "code_review", 0.85),
+    ("ready for review", "ready_review", 0.85),
+    ("changes ready", "changes_ready", 0.8),
+    ("implementation complete", "implementation_complete", 0.85),
+    ("代码审查", "code_review_chinese", 0.85),
+    ("请审查", "please_review_chinese", 0.8),
+    ("已完成实现", "implementation_done_chinese", 0.85)
+)
+
+# 弱完成信号（需要结合其他条件）
+_WEAK_SIGNALS = (
+    ("done", "done_text", 0.6),
+    ("finished", "finished_text", 0.6),
+    ("ready", "ready_text", 0.5),
+    # 新增：其他可能的完成提示
+    ("deploy", "deploy_ready", 0.7),
+    ("test", "test_ready", 0.6),
+    ("验证", "verify_chinese", 0.6),
+    ("部署", "deploy_chinese", 0.7)
+)
+
+_CRITICAL_ERROR_RE = _keyword_regex(_CRITICAL_ERRORS)
+_GENERAL_ERROR_RE = _keyword_regex(_GENERAL_ERRORS)
+_EXCLUDE_CONTEXT_RE = _keyword_regex(_EXCLUDE_CONTEXTS)
+_SYSTEM_INDICATOR_RE = _keyword_regex(_SYSTEM_INDICATORS)
+_REVIEW_RE = _keyword_regex(_REVIEW_KEYWORDS)
+_RUNNING_RE = _keyword_regex(_RUNNING_KEYWORDS)
+_COMPLETION_RE = _keyword_regex(_COMPLETION_KEYWORDS)
+
+
+def _signal_regex(signals) -> re.Pattern:
+    """将完成信号表编译为零宽前瞻正则，一次扫描找出所有位置出现的信号（包括相互重叠的）"""
+    return re.compile('(?=(' + '|'.join(re.escape(signal) for signal, _, _ in signals) + '))')
+
+
+def _first_signal(pattern: re.Pattern, signals, text_lower: str) -> Optional[tuple]:
+    """返回文本中出现的、在信号表中排序最靠前的信号，与按表顺序逐个查找的结果一致"""
+    found = set(pattern.findall(text_lower))
+    if not found:
+        return None
+    return next(entry for entry in signals if entry[0] in found)
+
+
+_STRONG_SIGNAL_RE = _signal_regex(_STRONG_SIGNALS)
+_WEAK_SIGNAL_RE = _signal_regex(_WEAK_SIGNALS)
+
+# 明确的运行中信号
+_RUNNING_INDICATOR_RE = _keyword_regex((
+    "running", "执行中", "processing", "generating",
+    "analyzing", "thinking", "loading", "waiting",
+    "please wait", "请稍等", "正在", "处理中"
+))
+
+# 聊天相关内容关键词 + 常见的编程相关词（任一命中即视为聊天内容）
+_CHAT_LINE_RE = _keyword_regex((
+    "claude", "cursor", "assistant", "ai", "助手",
+    "代码", "函数", "错误", "实现", "完成", "修复",
+    "测试", "运行", "调试", "配置", "安装",
+    "error", "function", "class", "import", "def", "return"
+))
+
+# OCR乱码字符和模式（合并为单个正则，一次替换；替换结果随后按空白切分，与逐个替换等价）
+_OCR_NOISE_RE = re.compile('|'.join((
+    r'[^\w\s\u4e00-\u9fff.,!?;:\'"()[\]{}\-+=<>/@#$%^&*~`|\\]',  # 保留基本标点和中英文
+    r'[_]{3,}',  # 连续下划线
+    r'[.]{4,}',  # 连续点号
+    r'[|]{2,}',  # 连续竖线
+    r'[~]{2,}',  # 连续波浪号
+    r'[\u2500-\u257F]+',  # 线框字符
+    r'[\u2580-\u259F]+',  # 块字符
+)))
+_SPECIAL_CHAR_RE = re.compile(r'[^\w\u4e00-\u9fff]')
+
+# 明显的乱码词汇模式（仅对长度小于6的词生效）
+_NOISE_WORD_RES = (
+    re.compile(r'^[A-Z]{1,2}[0-9]+$'),  # 类似 "A1", "B23"
+    re.compile(r'^\w{1,2}[\u4e00-\u9fff]{0,1}[\w]*$'),  # 混合乱码
+    re.compile(r'^[a-z][A-Z][a-z]+$'),  # 大小写混乱
+)
+
+# 无效内容过滤：只包含特殊字符 / 连续的符号 / 纯数字 / 单独的字母
+_INVALID_CONTENT_RES = (
+    re.compile(r'^[^\w\u4e00-\u9fff]+$'),
+    re.compile(r'^[_\-=+]{3,}$'),
+    re.compile(r'^[0-9.]{3,}$'),
+    re.compile(r'^[A-Z]{1,2}$'),
+)
+
 class IntelligentMonitor:
     """智能监控器 - 解决频繁误判和时间控制问题"""
     
+    # 已解析的window_regions.json，会话内重复初始化时无需再读文件；保存配置时失效
+    _cached_regions: Optional[dict] = None
+    
     def __init__(self, screen_monitor, timeout_seconds: int = 30):
         self.timeout_seconds = timeout_seconds
         self.window_selector = WindowSelector()
@@ -32,21 +224,39 @@ class IntelligentMonitor:
         
         # 状态跟踪
         self.current_state = None  # 添加缺失的current_state属性
-        self.last_content_hash = None
+        self.last_content_hash: Optional[Tuple[int, int]] = None
         self.last_change_time = time.time()
         self.stable_duration = 0
+        self._last_quick_hash: Optional[int] = None  # 上一帧分析区域原始像素的快速指纹
+        self._last_analysis_text = None
         
         # 添加重复检测
         self.recent_analysis_results = deque(maxlen=5)  # 保存最近5次分析结果
         
         # 历史记录
-        self.state_history = []
-        self.content_history = []
         self.history_limit = 20
         self.hash_history_limit = 10
+        self.state_history = deque(maxlen=self.history_limit)
+        # 内容hash历史：(文本指纹, dHash) 的uint64环形缓冲区，每项16字节，可向量化比较
+        self.content_history = np.zeros((self.hash_history_limit, 2), dtype=np.uint64)
+        self._hist_idx = 0
+        # 文本分类结果缓存（画面稳定时OCR文本不变，无需重复扫描关键词）
+        self._classification_cache: "OrderedDict[str, tuple]" = OrderedDict()
+        self.classification_cache_size = 16
+        self.dhash_change_threshold = 5  # 画面dHash汉明距离超过此值才算变化（忽略光标闪烁、抗锯齿抖动）
+        self.text_similarity_threshold = 0.9  # 文本词集合Jaccard相似度不低于此值视为轻微变化
+        self._last_tokens: frozenset = frozenset()
         
         # 配置
         self.stable_threshold = 3  # 连续稳定检测次数
+        self._sct = None  # MSS截屏实例（首次区域截屏时创建）
+        self._camera = None  # BetterCam后台截屏实例（首次区域截屏时启动）
+        self.capture_fps = 15
+        self._debug_save_regions = False  # 是否保存区域截图供调试
+        self.debug_crop_keep = 5
+        self._debug_crop_count = 0
+        self._region_cache: Dict[int, Tuple[int, str]] = {}  # 区域序号 -> (像素指纹, 识别文本)
+        self._ocr_pool: Optional[ThreadPoolExecutor] = None
         
     async def initialize(self) -> bool:
         """异步初始化方法"""
@@ -124,6 +334,12 @@ class IntelligentMonitor:
             import tkinter as tk
             from tkinter import messagebox, simpledialog
             
+            # 优先复用上次保存的窗口句柄，仍有效时无需枚举全部顶层窗口
+            saved_window = self._load_saved_window(win32gui)
+            if saved_window:
+                logger.info(f"🪟 复用已保存的CURSOR窗口: {saved_window['title']}")
+                return saved_window
+            
             # 查找所有CURSOR窗口
             cursor_windows = []
             def enum_handler(hwnd, result_list):
@@ -186,8 +402,36 @@ class IntelligentMonitor:
             logger.error(f"选择CURSOR窗口时出错: {e}")
             return None
     
+    def _load_saved_window(self, win32gui) -> Optional[dict]:
+        """从配置文件读取已保存的窗口句柄，校验仍然存在且可见后返回最新窗口信息"""
+        try:
+            for region_data in self.window_selector._load_config().values():
+                window = region_data.get("window") if isinstance(region_data, dict) else None
+                hwnd = window.get("hwnd") if window else None
+                if not hwnd or not (win32gui.IsWindow(hwnd) and win32gui.IsWindowVisible(hwnd)):
+                    continue
+                
+                window_text = win32gui.GetWindowText(hwnd)
+                if 'cursor' not in window_text.lower():
+                    continue  # 句柄已被其他窗口复用
+                
+                rect = win32gui.GetWindowRect(hwnd)
+                return {
+                    'hwnd': hwnd,
+                    'title': window_text,
+                    'rect': rect,
+                    'x': rect[0],
+                    'y': rect[1],
+                    'width': rect[2] - rect[0],
+                    'height': rect[3] - rect[1]
+                }
+        except Exception as e:
+            logger.debug(f"读取已保存窗口句柄时出错: {e}")
+        return None
+    
     def _save_region_config(self):
         """保存当前的区域配置"""
+        IntelligentMonitor._cached_regions = None
         try:
             if hasattr(self, 'selected_window_info') and self.selected_window_info and self.chat_regions:
                 # 如果有窗口信息，使用新的保存方法
@@ -211,17 +455,18 @@ class IntelligentMonitor:
     def load_saved_region_config(self) -> bool:
         """加载已保存的区域配置 - 快速启动模式"""
         try:
-            import json
             import os
             
             config_file = "window_regions.json"
             
-            if not os.path.exists(config_file):
-                logger.warning(f"⚠️ 配置文件不存在: {config_file}")
-                return False
-            
-            with open(config_file, 'r', encoding='utf-8') as f:
-                saved_regions = json.load(f)
+            saved_regions = IntelligentMonitor._cached_regions
+            if saved_regions is None:
+                if not os.path.exists(config_file):
+                    logger.warning(f"⚠️ 配置文件不存在: {config_file}")
+                    return False
+                
+                saved_regions = self.window_selector._load_config()
+                IntelligentMonitor._cached_regions = saved_regions
             
             if not saved_regions:
                 logger.warning("⚠️ 配置文件为空")
@@ -295,31 +540,48 @@ class IntelligentMonitor:
                 main_region = self.chat_regions[0]
                 x, y, width, height = main_region
                 
-                # 提取区域文本
-                analysis_text = self.window_selector.extract_region_text(
-                    screenshot, main_region, ocr_reader
-                )
-                
                 # 裁剪图像到监控区域
                 analysis_image = screenshot.crop((x, y, x + width, y + height))
+                analysis_text = None  # 画面未变时复用上次OCR结果
                 
-                logger.debug(f"🎯 分析主要区域: ({x}, {y}) 大小: {width}x{height}")
+                logger.debug("🎯 分析主要区域: (%s, %s) 大小: %sx%s", x, y, width, height)
             else:
                 # 使用全屏
+                main_region = None
                 analysis_text = extracted_text
                 analysis_image = screenshot
                 logger.debug("🖥️ 使用全屏分析")
             
-            # 计算内容hash
-            content_hash = self._calculate_content_hash(analysis_image, analysis_text)
-            
-            # 检测内容变化
-            content_changed = self._detect_content_change(content_hash)
+            # 原始像素快速指纹：与上一帧完全相同时跳过OCR、缩放和hash计算
+            raw = analysis_image.tobytes()
+            quick_hash = _fingerprint(raw)
+            if quick_hash == self._last_quick_hash and self._last_analysis_text is not None:
+                if analysis_text is None:
+                    analysis_text = self._last_analysis_text
+                content_changed = False
+            else:
+                if analysis_text is None:
+                    # 提取区域文本（直接使用已裁剪的区域图像，避免再裁剪一次）
+                    analysis_text = self.window_selector.extract_image_text(
+                        analysis_image, ocr_reader
+                    )
+                
+                # 计算内容hash（在快速指纹的字节上建立零拷贝数组视图）
+                frame = np.frombuffer(raw, dtype=np.uint8).reshape(
+                    analysis_image.height, analysis_image.width, -1
+                )
+                content_hash = self._calculate_content_hash(frame, analysis_text)
+                
+                # 检测内容变化：只有明显变化才重置稳定计时，OCR抖动等轻微变化不打断30秒超时
+                content_changed = self._detect_content_change(content_hash, analysis_text) == "major"
+                
+                self._last_quick_hash = quick_hash
+                self._last_analysis_text = analysis_text
             
             # 更新时间记录
             if content_changed:
                 self.last_change_time = current_time
-                logger.debug(f"🔄 检测到内容变化: {current_time}")
+                logger.debug("🔄 检测到内容变化: %s", current_time)
             
             # 计算稳定时间
             stable_duration = current_time - self.last_change_time
@@ -341,42 +603,76 @@ class IntelligentMonitor:
             logger.error(f"智能状态分析时出错: {e}")
             return self._get_default_state()
     
-    def _calculate_content_hash(self, image: Image.Image, text: str) -> str:
-        """计算内容hash"""
+    def _calculate_content_hash(self, frame: np.ndarray, text: str) -> Tuple[int, int]:
+        """计算内容hash：(文本指纹, 画面64位dHash)，frame为(高, 宽, 通道)像素数组"""
         try:
-            # 降低图像分辨率以减少计算量
-            small_image = image.resize((100, 100))
+            text_hash = _fingerprint(text.encode('utf-8', 'ignore'))
+            
+            # 跨步切片降采样到约64x72（零拷贝视图，相当于NEAREST缩放）
+            height, width = frame.shape[:2]
+            sample = frame[::max(height // 64, 1), ::max(width // 72, 1), :3]
+            rows = sample.shape[0] // 8 * 8
+            cols = sample.shape[1] // 9 * 9
+            if rows == 0 or cols == 0:
+                return text_hash, 0
             
-            # 组合图像和文本特征
-            content = f"{text}_{hash(small_image.tobytes())}"
+            # 差值哈希：按块取均值得到9x8灰度图，每行相邻像素比较，对像素级抖动不敏感
+            gray = sample[:rows, :cols].reshape(8, rows // 8, 9, cols // 9, -1).mean(axis=(1, 3, 4))
+            bits = np.packbits(gray[:, 1:] > gray[:, :-1])
+            dhash = int.from_bytes(bits.tobytes(), 'big')
             
-            return hashlib.md5(content.encode()).hexdigest()
+            return text_hash, dhash
             
         except Exception as e:
             logger.debug(f"计算内容hash时出错: {e}")
-            return str(time.time())
+            return time.time_ns(), 0
     
-    def _detect_content_change(self, current_hash: str) -> bool:
-        """检测内容是否发生变化"""
+    def _detect_content_change(self, current_hash: Tuple[int, int], text: str) -> str:
+        """检测内容变化程度，返回 "same" / "minor" / "major"
+        
+        minor：画面dHash差异不超过阈值，且文本词集合Jaccard相似度不低于阈值（OCR抖动、光标闪烁），
+               或与最近历史中的某个内容完全相同
+        major：其余变化，更新比较基准；minor不更新基准，累积的小变化最终仍会判为major
+        """
         try:
             if self.last_content_hash is None:
                 self.last_content_hash = current_hash
-                return True
-            
-            if current_hash != self.last_content_hash:
-                # 保存到历史
-                self.content_history.append(self.last_content_hash)
-                if len(self.content_history) > self.hash_history_limit:
-                    self.content_history.pop(0)
-                
-                self.last_content_hash = current_hash
-                return True
-            
-            return False
+                self._last_tokens = frozenset(text.split())
+                return "major"
+            
+            text_hash, dhash = current_hash
+            last_text_hash, last_dhash = self.last_content_hash
+            image_similar = (dhash ^ last_dhash).bit_count() <= self.dhash_change_threshold
+            if text_hash == last_text_hash and image_similar:
+                return "same"
+            
+            tokens = frozenset(text.split())
+            if image_similar:
+                union = len(tokens | self._last_tokens)
+                similarity = len(tokens & self._last_tokens) / union if union else 1.0
+                if similarity >= self.text_similarity_threshold:
+                    return "minor"
+            
+            # 回到最近出现过的画面（如加载动画、提示框反复切换）不算实质进展
+            if self._is_known_content(current_hash):
+                return "minor"
+            
+            # 保存到历史
+            self.content_history[self._hist_idx % self.hash_history_limit] = self.last_content_hash
+            self._hist_idx += 1
+            
+            self.last_content_hash = current_hash
+            self._last_tokens = tokens
+            return "major"
             
         except Exception as e:
             logger.debug(f"检测内容变化时出错: {e}")
-            return False
+            return "same"
+    
+    def _is_known_content(self, current_hash: Tuple[int, int]) -> bool:
+        """判断内容hash是否出现在最近的历史记录中"""
+        filled = self.content_history[:min(self._hist_idx, self.hash_history_limit)]
+        return bool(np.any(np.all(filled == np.array(current_hash, dtype=np.uint64), axis=1)))
     
     def _intelligent_state_detection(self, text: str, image: Image.Image, 
                                    stable_duration: float, content_changed: bool) -> Dict[str, Any]:
@@ -384,11 +680,8 @@ class IntelligentMonitor:
         try:
             current_time = time.time()
             
-            # 基础状态检测
-            base_state = self._detect_base_state(text, image)
-            
-            # 检测明确的完成信号（优先级最高）
-            completion_signals = self._detect_completion_signals(text, image)
+            # 基础状态检测 + 检测明确的完成信号（优先级最高）
+            base_state, completion_signals = self._classify_text(text, image)
             if completion_signals["detected"]:
                 logger.info(f"✅ 检测到完成信号: {completion_signals['signal_type']}")
                 return {
@@ -421,7 +714,7 @@ class IntelligentMonitor:
             
             # 检查是否系统正在运行（忙碌状态）
             if base_state in ["running", "processing"]:
-                logger.debug(f"💼 系统忙碌中: {base_state}")
+                logger.debug("💼 系统忙碌中: %s", base_state)
                 return {
                     "state": base_state,
                     "reasoning": f"系统正在{base_state}，等待完成",
@@ -451,7 +744,7 @@ class IntelligentMonitor:
                 }
             
             # 其他状态处理
-            logger.debug(f"🔍 当前状态: {base_state}, 稳定时间: {stable_duration:.1f}s")
+            logger.debug("🔍 当前状态: %s, 稳定时间: %.1fs", base_state, stable_duration)
             return {
                 "state": base_state,
                 "reasoning": f"基础状态检测: {base_state}",
@@ -467,33 +760,38 @@ class IntelligentMonitor:
             logger.error(f"智能状态检测时出错: {e}")
             return self._get_default_state()
     
-    def _detect_base_state(self, text: str, image: Image.Image) -> str:
-        """检测基础状态"""
+    def _classify_text(self, text: str, image: Image.Image) -> tuple:
+        """返回(基础状态, 完成信号)，相同文本复用最近的分类结果"""
+        cached = self._classification_cache.get(text)
+        if cached is not None:
+            self._classification_cache.move_to_end(text)
+            return cached
+        
+        text_lower = text.lower()  # 小写只计算一次，供状态检测和完成信号检测共用
+        result = (self._detect_base_state(text_lower, image), self._detect_completion_signals(text_lower, image))
+        self._classification_cache[text] = result
+        if len(self._classification_cache) > self.classification_cache_size:
+            self._classification_cache.popitem(last=False)
+        return result
+    
+    def _detect_base_state(self, text_lower: str, image: Image.Image) -> str:
+        """检测基础状态（text_lower为已转小写的文本）"""
         try:
-            text_lower = text.lower()
-            
             # 智能错误状态检测 - 避免误判
             if self._is_real_error(text_lower):
                 return "error"
             
             # 新增：代码审查和任务完成状态检测（优先级高）
-            review_keywords = [
-                "review changes", "code review", "ready for review", 
-                "changes ready", "implementation complete", "代码审查", 
-                "请审查", "已完成实现", "review", "changes"
-            ]
-            if any(keyword in text_lower for keyword in review_keywords):
+            if _REVIEW_RE.search(text_lower):
                 logger.info(f"🔍 检测到审查/完成状态关键词在文本中")
                 return "completed"
             
             # 运行状态检测
-            running_keywords = ["running", "执行中", "processing", "loading", "正在", "generating", "thinking"]
-            if any(keyword in text_lower for keyword in running_keywords):
+            if _RUNNING_RE.search(text_lower):
                 return "running"
             
             # 完成状态检测
-            completion_keywords = ["completed", "完成", "success", "successfully", "✅", "🎉", "done", "finished"]
-            if any(keyword in text_lower for keyword in completion_keywords):
+            if _COMPLETION_RE.search(text_lower):
                 return "completed"
             
             # 默认为等待输入
@@ -507,69 +805,31 @@ class IntelligentMonitor:
         """智能判断是否为真正的错误状态"""
         try:
             # 添加调试输出
-            logger.debug(f"🔍 检查文本是否为错误状态...")
-            logger.debug(f"📝 文本长度: {len(text_lower)} 字符")
-            logger.debug(f"📄 文本预览: {repr(text_lower[:100])}")
-            
-            # 严重错误关键词（优先级高）
-            critical_errors = [
-                "fatal error", "critical error", "system error", "crash",
-                "致命错误", "严重错误", "系统错误", "崩溃"
-            ]
-            
-            for error in critical_errors:
-                if error in text_lower:
-                    logger.warning(f"🚨 检测到严重错误: {error}")
-                    return True
-            
-            # 一般错误关键词（需要上下文判断）
-            general_errors = ["error", "错误", "失败", "exception", "traceback", "failed"]
-            
-            # 扩展排除的上下文（这些情况下的错误关键词不算真正错误）
-            exclude_contexts = [
-                # 错误处理相关
-                "error handling", "error message", "error code", "error log",
-                "try catch", "exception handling", "error prevention",
-                "错误处理", "错误信息", "错误代码", "错误日志", "异常处理",
-                
-                # 开发调试相关
-                "debug", "test", "example", "示例", "测试", "调试",
-                
-                # 终端和系统输出相关
-                "powershell", "cmd", "terminal", "console", "shell",
-                "categoryinfo", "parsererror", "commandnotfound",
-                "fullyqualifiedid", "itemnotfound", "objectnotfound",
-                "parentcontains", "标记", "不是", "版本", "有效", "语句分隔符",
-                
-                # 日志和监控相关
-                "log", "info", "warning", "监控", "检测", "分析",
-                "cursor", "supervisor", "monitor", "智能", "状态",
-                
-                # OCR识别错误相关
-                "ocr", "识别", "文本", "字符", "内容", "预览"
-            ]
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("🔍 检查文本是否为错误状态...")
+                logger.debug("📝 文本长度: %d 字符", len(text_lower))
+                logger.debug("📄 文本预览: %r", text_lower[:100])
+            
+            critical = _CRITICAL_ERROR_RE.search(text_lower)
+            if critical:
+                logger.warning(f"🚨 检测到严重错误: {critical.group()}")
+                return True
             
-            # 检查是否有错误关键词
-            found_errors = [keyword for keyword in general_errors if keyword in text_lower]
+            # 检查是否有错误关键词（去重，与逐词查找得到的关键词集合一致）
+            found_errors = set(_GENERAL_ERROR_RE.findall(text_lower))
             
             if found_errors:
-                logger.debug(f"⚠️ 发现错误关键词: {found_errors}")
+                logger.debug("⚠️ 发现错误关键词: %s", found_errors)
                 
                 # 检查是否在排除的上下文中
-                in_exclude_context = any(context in text_lower for context in exclude_contexts)
+                in_exclude_context = _EXCLUDE_CONTEXT_RE.search(text_lower) is not None
                 
                 if in_exclude_context:
                     logger.debug("🔍 检测到错误关键词，但在排除上下文中，不视为真正错误")
                     return False
                 
                 # 检查是否包含系统/终端特征词汇
-                system_indicators = [
-                    "ps ", "c:\\", "d:\\", "所在位置", "行:", "字符:", 
-                    "cmdlet", "function", "script", "程序", "路径",
-                    "拼写", "确保", "再试一次", "无法", "识别", "找不到"
-                ]
-                
-                has_system_indicators = any(indicator in text_lower for indicator in system_indicators)
+                has_system_indicators = _SYSTEM_INDICATOR_RE.search(text_lower) is not None
                 if has_system_indicators:
                     logger.debug("🔍 检测到系统/终端特征，不视为真正错误")
                     return False
@@ -586,7 +846,7 @@ class IntelligentMonitor:
                 
                 # 如果错误密度很低（长文本中少量错误词），可能不是真正错误
                 if error_density < 5 and text_length > 200:  # 每1000字符少于5个错误词
-                    logger.debug(f"🔍 错误密度较低 ({error_density:.2f}/1000字符)，可能不是真正错误")
+                    logger.debug("🔍 错误密度较低 (%.2f/1000字符)，可能不是真正错误", error_density)
                     return False
                 
                 # 如果有多个错误关键词但文本很长，需要更仔细判断
@@ -611,8 +871,8 @@ class IntelligentMonitor:
             logger.debug(f"智能错误判断时出错: {e}")
             return False
     
-    def _detect_completion_signals(self, text: str, image: Image.Image) -> Dict[str, Any]:
-        """检测明确的完成信号"""
+    def _detect_completion_signals(self, text_lower: str, image: Image.Image) -> Dict[str, Any]:
+        """检测明确的完成信号（text_lower为已转小写的文本）"""
         try:
             signals = {
                 "detected": False,
@@ -620,53 +880,25 @@ class IntelligentMonitor:
                 "confidence": 0.0
             }
             
-            text_lower = text.lower()
-            
             # 强完成信号
-            strong_signals = [
-                ("🎉", "celebration_emoji", 0.95),
-                ("✅", "checkmark_emoji", 0.9),
-                ("completed successfully", "completion_text", 0.9),
-                ("任务完成", "task_completion_chinese", 0.9),
-                ("execution finished", "execution_completion", 0.85),
-                ("build successful", "build_completion", 0.85),
-                # 新增：代码审查和任务交付相关信号
-                ("review changes", "review_changes", 0.9),
-                ("code review", "code_review", 0.85),
-                ("ready for review", "ready_review", 0.85),
-                ("changes ready", "changes_ready", 0.8),
-                ("implementation complete", "implementation_complete", 0.85),
-                ("代码审查", "code_review_chinese", 0.85),
-                ("请审查", "please_review_chinese", 0.8),
-                ("已完成实现", "implementation_done_chinese", 0.85)
-            ]
-            
-            for signal, signal_type, confidence in strong_signals:
-                if signal in text_lower:
-                    signals["detected"] = True
-                    signals["signal_type"] = signal_type
-                    signals["confidence"] = confidence
-                    logger.info(f"🎯 检测到强完成信号: {signal} (类型: {signal_type}, 置信度: {confidence})")
-                    return signals
-            
-            # 弱完成信号（需要结合其他条件）
-            weak_signals = [
-                ("done", "done_text", 0.6),
-                ("finished", "finished_text", 0.6),
-                ("ready", "ready_text", 0.5),
-                # 新增：其他可能的完成提示
-                ("deploy", "deploy_ready", 0.7),
-                ("test", "test_ready", 0.6),
-                ("验证", "verify_chinese", 0.6),
-                ("部署", "deploy_chinese", 0.7)
-            ]
-            
-            for signal, signal_type, confidence in weak_signals:
-                if signal in text_lower and len(text.strip()) < 100:  # 短文本更可能是完成信号
-                    signals["detected"] = True
-                    signals["signal_type"] = signal_type
-                    signals["confidence"] = confidence
-                    return signals
+            strong = _first_signal(_STRONG_SIGNAL_RE, _STRONG_SIGNALS, text_lower)
+            if strong:
+                signal, signal_type, confidence = strong
+                signals["detected"] = True
+                signals["signal_type"] = signal_type
+                signals["confidence"] = confidence
+                logger.info(f"🎯 检测到强完成信号: {signal} (类型: {signal_type}, 置信度: {confidence})")
+                return signals
+            
+            # 弱完成信号（需要结合其他条件）：短文本更可能是完成信号
+            if len(text_lower.strip()) >= 100:
+                return signals
+            weak = _first_signal(_WEAK_SIGNAL_RE, _WEAK_SIGNALS, text_lower)
+            if weak:
+                _, signal_type, confidence = weak
+                signals["detected"] = True
+                signals["signal_type"] = signal_type
+                signals["confidence"] = confidence
             
             return signals
             
@@ -683,10 +915,6 @@ class IntelligentMonitor:
                 
                 # 添加到历史记录
                 self.state_history.append(state_info)
-                
-                # 限制历史记录长度
-                if len(self.state_history) > self.history_limit:
-                    self.state_history.pop(0)
                     
         except Exception as e:
             logger.error(f"更新状态历史时出错: {e}")
@@ -744,9 +972,13 @@ class IntelligentMonitor:
             self.state_start_time = None
             self.last_change_time = time.time()
             self.last_content_hash = None
+            self._last_tokens = frozenset()
+            self._last_quick_hash = None
+            self._last_analysis_text = None
             self.stable_duration = 0
             self.state_history.clear()
-            self.content_history.clear()
+            self.content_history.fill(0)
+            self._hist_idx = 0
             
             logger.info("🔄 监控状态已重置")
             
@@ -790,20 +1022,7 @@ class IntelligentMonitor:
     
     def _is_clearly_running(self, text: str, image: Image.Image) -> bool:
         """检测是否明确在运行状态"""
-        text_lower = text.lower()
-        
-        # 运行中的明确信号
-        running_indicators = [
-            "running", "执行中", "processing", "generating",
-            "analyzing", "thinking", "loading", "waiting",
-            "please wait", "请稍等", "正在", "处理中"
-        ]
-        
-        for indicator in running_indicators:
-            if indicator in text_lower:
-                return True
-        
-        return False
+        return _RUNNING_INDICATOR_RE.search(text.lower()) is not None
     
     async def detect_cursor_window(self, screenshot: Image.Image) -> bool:
         """检测CURSOR窗口是否存在"""
@@ -839,13 +1058,9 @@ class IntelligentMonitor:
                     window_right = window_x + window_width
                     window_bottom = window_y + window_height
                     
-                    logger.debug(f"🎯 使用已选择的窗口: {self.screen_monitor.selected_window_info.get('title', 'Unknown')}")
-                    logger.debug(f"🪟 窗口位置: ({window_x}, {window_y}) 大小: {window_width}x{window_height}")
-                    
-                    # 获取窗口截图
-                    import pyautogui
-                    window_screenshot = pyautogui.screenshot(region=(window_x, window_y, window_width, window_height))
-                    logger.debug(f"📸 获取指定窗口截图: {window_screenshot.size}")
+                    logger.debug("🎯 使用已选择的窗口: %s", self.screen_monitor.selected_window_info.get('title', 'Unknown'))
+                    logger.debug("🪟 窗口位置: (%s, %s) 大小: %sx%s", window_x, window_y, window_width, window_height)
+                    window_screenshot = None  # 各区域直接按屏幕坐标截取，窗口范围仅用于校验
                     
                 elif hasattr(self.screen_monitor, 'cursor_window_coords') and self.screen_monitor.cursor_window_coords:
                     # 使用screen_monitor的窗口坐标
@@ -853,25 +1068,28 @@ class IntelligentMonitor:
                     window_width = window_right - window_x
                     window_height = window_bottom - window_y
                     
-                    logger.debug(f"🎯 使用screen_monitor的窗口坐标")
-                    logger.debug(f"🪟 窗口位置: ({window_x}, {window_y}) 大小: {window_width}x{window_height}")
-                    
-                    # 获取窗口截图
-                    import pyautogui
-                    window_screenshot = pyautogui.screenshot(region=(window_x, window_y, window_width, window_height))
-                    logger.debug(f"📸 获取窗口截图: {window_screenshot.size}")
+                    logger.debug("🎯 使用screen_monitor的窗口坐标")
+                    logger.debug("🪟 窗口位置: (%s, %s) 大小: %sx%s", window_x, window_y, window_width, window_height)
+                    window_screenshot = None  # 各区域直接按屏幕坐标截取，窗口范围仅用于校验
                     
                 else:
                     logger.warning("⚠️ 没有可用的窗口信息，使用传入的截图")
                     window_screenshot = screenshot
                     window_x, window_y = 0, 0
+                    window_width, window_height = screenshot.size
                     
             except Exception as e:
                 logger.warning(f"⚠️ 获取窗口信息失败: {e}，使用传入截图")
                 window_screenshot = screenshot
                 window_x, window_y = 0, 0
+                window_width, window_height = screenshot.size
 
+            # 所有区域从同一帧切片：每次调用只读取一次后台截屏帧，并在线程中等待，不阻塞事件循环
+            frame = await asyncio.to_thread(self._latest_frame) if window_screenshot is None else None
+            
             # 处理每个监控区域
+            region_crops = []
+            debug_enabled = logger.isEnabledFor(logging.DEBUG)
             for i, region_coords in enumerate(self.chat_regions, 1):
                 try:
                     saved_x, saved_y, crop_width, crop_height = region_coords
@@ -880,49 +1098,76 @@ class IntelligentMonitor:
                     rel_crop_x = saved_x - window_x
                     rel_crop_y = saved_y - window_y
                     
-                    logger.debug(f"🎯 区域{i} 坐标转换:")
-                    logger.debug(f"   保存的绝对坐标: ({saved_x}, {saved_y})")
-                    logger.debug(f"   窗口位置: ({window_x}, {window_y})")
-                    logger.debug(f"   转换后相对坐标: ({rel_crop_x}, {rel_crop_y}) 大小: {crop_width}x{crop_height}")
+                    if debug_enabled:
+                        logger.debug("🎯 区域%s 坐标转换:", i)
+                        logger.debug("   保存的绝对坐标: (%s, %s)", saved_x, saved_y)
+                        logger.debug("   窗口位置: (%s, %s)", window_x, window_y)
+                        logger.debug("   转换后相对坐标: (%s, %s) 大小: %sx%s", rel_crop_x, rel_crop_y, crop_width, crop_height)
                     
                     # 验证相对坐标是否在窗口范围内
-                    window_w, window_h = window_screenshot.size
                     if (rel_crop_x < 0 or rel_crop_y < 0 or 
-                        rel_crop_x + crop_width > window_w or 
-                        rel_crop_y + crop_height > window_h):
+                        rel_crop_x + crop_width > window_width or 
+                        rel_crop_y + crop_height > window_height):
                         logger.warning(f"⚠️ 区域{i}相对坐标超出窗口范围，跳过")
-                        logger.warning(f"   窗口: {window_w}x{window_h}, 区域: ({rel_crop_x},{rel_crop_y}) 到 ({rel_crop_x+crop_width},{rel_crop_y+crop_height})")
+                        logger.warning(f"   窗口: {window_width}x{window_height}, 区域: ({rel_crop_x},{rel_crop_y}) 到 ({rel_crop_x+crop_width},{rel_crop_y+crop_height})")
                         continue
                     
-                    # 使用相对坐标裁剪窗口截图
-                    cropped_image = window_screenshot.crop((rel_crop_x, rel_crop_y, rel_crop_x + crop_width, rel_crop_y + crop_height))
+                    if window_screenshot is None:
+                        # 只截取区域本身，不再截整个窗口后裁剪
+                        cropped_image = self._grab_region(saved_x, saved_y, crop_width, crop_height, frame)
+                    else:
+                        # 使用相对坐标裁剪传入的截图
+                        cropped_image = window_screenshot.crop((rel_crop_x, rel_crop_y, rel_crop_x + crop_width, rel_crop_y + crop_height))
                     
                     # 验证裁剪图像是否有效
                     if cropped_image.size[0] <= 0 or cropped_image.size[1] <= 0:
                         logger.error(f"❌ 区域{i}裁剪图像尺寸无效: {cropped_image.size}")
                         continue
 
-                    # 保存区域截图供调试
-                    region_screenshot_path = f"region_screenshot_{i}_{int(time.time())}.png"
-                    cropped_image.save(region_screenshot_path)
-                    logger.debug(f"📸 已保存区域{i}截图: {region_screenshot_path}")
-                    
-                    # 使用OCR提取文字
-                    # 使用OCR提取文字（核心方法）
-                    region_text = await self._ocr_extract_text(cropped_image)
+                    # 保存区域截图供调试（默认关闭；每个区域只轮换保留最近几张JPEG）
+                    if self._debug_save_regions:
+                        slot = self._debug_crop_count % self.debug_crop_keep
+                        region_screenshot_path = f"region_screenshot_{i}_{slot}.jpg"
+                        cropped_image.convert('RGB').save(region_screenshot_path, quality=60)
+                        logger.debug("📸 已保存区域%s截图: %s", i, region_screenshot_path)
                     
-                    if region_text and not region_text.startswith("OCR_FAILED"):
-                        logger.info(f"✅ 区域{i} OCR成功: {region_text[:50]}...")
-                        if self._is_valid_content(region_text):
-                            all_region_texts.append(region_text)
-                        else:
-                            logger.debug(f"📝 区域{i} 内容无效，跳过: {region_text[:30]}...")
-                    else:
-                        logger.warning(f"⚠️ 区域{i} OCR失败或无内容: {region_text}")
+                    region_crops.append((i, cropped_image))
                         
                 except Exception as e:
                     logger.error(f"❌ 处理区域{i}时出错: {e}")
                     continue
+            
+            self._debug_crop_count += 1
+            
+            # 区域像素与上次完全相同时直接复用上次的识别结果，只对变化的区域做OCR
+            region_texts = {}
+            pending = []
+            for i, crop in region_crops:
+                crop_hash = _fingerprint(crop.tobytes())
+                cached = self._region_cache.get(i)
+                if cached and cached[0] == crop_hash:
+                    region_texts[i] = cached[1]
+                else:
+                    pending.append((i, crop, crop_hash))
+            
+            # 使用OCR提取文字（所有区域合并为一次批量识别）
+            if pending:
+                ocr_texts = await self._ocr_extract_text_batch([crop for _, crop, _ in pending])
+                for (i, _, crop_hash), region_text in zip(pending, ocr_texts):
+                    if region_text:  # 空结果可能是OCR临时失败，不缓存
+                        self._region_cache[i] = (crop_hash, region_text)
+                    region_texts[i] = region_text
+            
+            for i, _ in region_crops:
+                region_text = region_texts[i]
+                if region_text and not region_text.startswith("OCR_FAILED"):
+                    logger.info(f"✅ 区域{i} OCR成功: {region_text[:50]}...")
+                    if self._is_valid_content(region_text):
+                        all_region_texts.append(region_text)
+                    else:
+                        logger.debug("📝 区域%s 内容无效，跳过: %s...", i, region_text[:30])
+                else:
+                    logger.warning(f"⚠️ 区域{i} OCR失败或无内容: {region_text}")
 
             # 合并所有区域的文本
             if all_region_texts:
@@ -937,48 +1182,122 @@ class IntelligentMonitor:
             logger.error(f"❌ 从截图提取文本时出错: {e}")
             return f"OCR_FAILED:EXTRACT_ERROR:{e}"
 
+    def _start_camera(self):
+        """启动BetterCam后台截屏线程，失败时返回None并回退到同步截屏"""
+        try:
+            camera = bettercam.create(output_idx=0, output_color='RGB')
+            camera.start(target_fps=self.capture_fps, video_mode=True)
+            logger.info("📷 已启动BetterCam后台截屏")
+            return camera
+        except Exception as e:
+            logger.debug(f"启动BetterCam失败，使用同步截屏: {e}")
+            return None
+    
+    def _latest_frame(self) -> Optional[np.ndarray]:
+        """读取后台截屏的最新整屏帧（会等待下一帧，应在线程中调用）；不可用时返回None"""
+        if not BETTERCAM_AVAILABLE:
+            return None
+        if self._camera is None:
+            self._camera = self._start_camera() or False
+        return self._camera.get_latest_frame() if self._camera else None
+    
+    def _grab_region(self, left: int, top: int, width: int, height: int,
+                     frame: Optional[np.ndarray] = None) -> Image.Image:
+        """按屏幕坐标直接截取区域，优先从本次读取的后台截屏帧中切片，其次MSS"""
+        # 后台截屏只覆盖主屏幕，区域超出时回退到同步截屏
+        if (frame is not None and left >= 0 and top >= 0 and
+                top + height <= frame.shape[0] and left + width <= frame.shape[1]):
+            return Image.fromarray(frame[top:top + height, left:left + width])
+        
+        if self._sct is None and MSS_AVAILABLE:
+            self._sct = mss.mss()
+        
+        if self._sct is not None:
+            shot = self._sct.grab({"left": left, "top": top, "width": width, "height": height})
+            return Image.frombytes('RGB', shot.size, shot.bgra, 'raw', 'BGRX')
+        
+        return pyautogui.screenshot(region=(left, top, width, height))
+    
     async def _ocr_extract_text(self, image: Image.Image) -> str:
         """OCR提取文本的核心方法"""
+        return (await self._ocr_extract_text_batch([image]))[0]
+    
+    def _get_ocr_reader(self):
+        """返回可用的OCR引擎：优先自身的reader，其次全局OCR"""
+        if getattr(self, 'ocr_reader', None):
+            return self.ocr_reader
+        from modules.screen_monitor import ScreenMonitor
+        return getattr(ScreenMonitor, '_global_ocr_reader', None)
+    
+    def _results_to_text(self, results) -> str:
+        """将EasyOCR识别结果合并为清理后的文本"""
+        all_texts = [result[1].strip() for result in results if result[1] and result[1].strip()]
+        if not all_texts:
+            return ""
+        # 清理OCR乱码和噪声
+        return self._clean_ocr_text(' '.join(all_texts)) or ""
+    
+    def _get_ocr_pool(self) -> ThreadPoolExecutor:
+        """OCR工作线程池：区域预处理并行执行（OpenCV运算释放GIL），识别调用移出事件循环"""
+        if self._ocr_pool is None:
+            workers = max(1, min(len(self.chat_regions) or 1, os.cpu_count() or 1))
+            self._ocr_pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="ocr")
+        return self._ocr_pool
+    
+    async def _ocr_extract_text_batch(self, images: List[Image.Image]) -> List[str]:
+        """批量OCR：多个区域填充到统一尺寸后一次readtext_batched调用，返回与输入一一对应的文本"""
+        if not images:
+            return []
         try:
-            # 尝试使用screen_monitor的预处理以提升识别率
+            pool = self._get_ocr_pool()
+            
+            # 尝试使用screen_monitor的预处理以提升识别率（各区域并行）
             try:
                 if getattr(self, 'screen_monitor', None):
-                    image = self.screen_monitor.preprocess_image(image)
+                    images = list(pool.map(self.screen_monitor.preprocess_image, images))
             except Exception as e:
                 logger.debug(f"OCR预处理失败: {e}")
-
-            # 尝试使用EasyOCR
-            if hasattr(self, 'ocr_reader') and self.ocr_reader:
-                import numpy as np
-                img_array = np.array(image)
-                results = self.ocr_reader.readtext(img_array)
-                if results:
-                    all_texts = [result[1].strip() for result in results if result[1] and result[1].strip()]
-                    if all_texts:
-                        combined_text = ' '.join(all_texts)
-                        # 清理OCR乱码和噪声
-                        cleaned_text = self._clean_ocr_text(combined_text)
-                        return cleaned_text if cleaned_text else ""
-            
-            # 尝试使用全局OCR
-            from modules.screen_monitor import ScreenMonitor
-            if hasattr(ScreenMonitor, '_global_ocr_reader') and ScreenMonitor._global_ocr_reader:
-                import numpy as np
-                img_array = np.array(image)
-                results = ScreenMonitor._global_ocr_reader.readtext(img_array)
-                if results:
-                    all_texts = [result[1].strip() for result in results if result[1] and result[1].strip()]
-                    if all_texts:
-                        combined_text = ' '.join(all_texts)
-                        # 清理OCR乱码和噪声
-                        cleaned_text = self._clean_ocr_text(combined_text)
-                        return cleaned_text if cleaned_text else ""
             
-            return ""
+            reader = self._get_ocr_reader()
+            if not reader:
+                return [""] * len(images)
+            
+            # 只读使用像素，asarray直接走数组接口；仅非RGB/灰度图才需要转换模式
+            arrays = [
+                np.asarray(image if image.mode in ('RGB', 'L') else image.convert('RGB'))
+                for image in images
+            ]
+            # OCR模型（尤其GPU上的EasyOCR）不保证线程安全，识别仍串行，只是不阻塞事件循环
+            batch_results = await asyncio.get_running_loop().run_in_executor(
+                pool, self._recognize_batch, reader, arrays
+            )
+            return [self._results_to_text(results) for results in batch_results]
             
         except Exception as e:
             logger.warning(f"⚠️ 直接OCR提取失败: {e}")
-            return ""
+            return [""] * len(images)
+    
+    def _recognize_batch(self, reader, arrays: List[np.ndarray]) -> List[list]:
+        """对一组图像数组做文字识别，返回与输入一一对应的识别结果"""
+        # 只有原生批处理的识别器（EasyOCR）才值得填充成统一尺寸，其余逐个识别原始区域
+        if (len(arrays) == 1 or not getattr(reader, 'native_batching', True)
+                or len({arr.ndim for arr in arrays}) != 1):
+            return [reader.readtext(arr) for arr in arrays]
+        
+        # 以白色背景填充到最大区域尺寸（向上取整到32的倍数），避免缩放改变文字比例
+        height = -(-max(arr.shape[0] for arr in arrays) // 32) * 32
+        width = -(-max(arr.shape[1] for arr in arrays) // 32) * 32
+        padded = []
+        for arr in arrays:
+            canvas = np.full((height, width) + arr.shape[2:], 255, dtype=np.uint8)
+            canvas[:arr.shape[0], :arr.shape[1]] = arr
+            padded.append(canvas)
+        
+        try:
+            return reader.readtext_batched(padded, n_width=width, n_height=height)
+        except Exception as e:
+            logger.debug(f"批量OCR失败，逐个区域识别: {e}")
+            return [reader.readtext(arr) for arr in arrays]
     
     def _clean_ocr_text(self, text: str) -> str:
         """清理OCR提取的文本，去除乱码和噪声"""
@@ -986,67 +1305,39 @@ class IntelligentMonitor:
             if not text or not text.strip():
                 return ""
             
-            import re
-            
             # 1. 移除常见的OCR乱码字符和模式
-            ocr_noise_patterns = [
-                r'[^\w\s\u4e00-\u9fff.,!?;:\'"()[\]{}\-+=<>/@#$%^&*~`|\\]',  # 保留基本标点和中英文
-                r'[_]{3,}',  # 连续下划线
-                r'[.]{4,}',  # 连续点号
-                r'[|]{2,}',  # 连续竖线
-                r'[~]{2,}',  # 连续波浪号
-                r'[\u2500-\u257F]+',  # 线框字符
-                r'[\u2580-\u259F]+',  # 块字符
-            ]
-            
-            cleaned_text = text
-            for pattern in ocr_noise_patterns:
-                cleaned_text = re.sub(pattern, ' ', cleaned_text)
+            cleaned_text = _OCR_NOISE_RE.sub(' ', text)
             
             # 2. 清理明显的乱码词汇（基于字符频率和模式）
-            words = cleaned_text.split()
             valid_words = []
             
-            for word in words:
+            for word in cleaned_text.split():
                 # 跳过太短的单词
                 if len(word) < 2:
                     continue
                 
                 # 跳过包含过多特殊字符的单词
-                special_char_ratio = len(re.findall(r'[^\w\u4e00-\u9fff]', word)) / len(word)
+                special_char_ratio = len(_SPECIAL_CHAR_RE.findall(word)) / len(word)
                 if special_char_ratio > 0.5:
                     continue
                 
                 # 跳过明显的乱码模式
-                noise_patterns = [
-                    r'^[A-Z]{1,2}[0-9]+$',  # 类似 "A1", "B23"
-                    r'^\w{1,2}[\u4e00-\u9fff]{0,1}[\w]*$',  # 混合乱码
-                    r'^[a-z][A-Z][a-z]+$',  # 大小写混乱
-                ]
-                
-                is_noise = False
-                for pattern in noise_patterns:
-                    if re.match(pattern, word) and len(word) < 6:
-                        is_noise = True
-                        break
+                if len(word) < 6 and any(pattern.match(word) for pattern in _NOISE_WORD_RES):
+                    continue
                 
-                if not is_noise:
-                    valid_words.append(word)
+                valid_words.append(word)
             
-            # 3. 重组文本
+            # 3. 重组文本（单词本身不含空白，join后空格已规范化）
             result = ' '.join(valid_words)
             
-            # 4. 最终清理：规范化空格
-            result = re.sub(r'\s+', ' ', result).strip()
-            
-            # 5. 如果清理后文本太短，返回空字符串
+            # 4. 如果清理后文本太短，返回空字符串
             if len(result) < 3:
-                logger.debug(f"文本清理后太短，丢弃: '{result}'")
+                logger.debug("文本清理后太短，丢弃: '%s'", result)
                 return ""
             
-            # 6. 记录清理结果
+            # 5. 记录清理结果
             if result != text.strip():
-                logger.debug(f"OCR文本清理: '{text[:50]}...' -> '{result[:50]}...'")
+                logger.debug("OCR文本清理: '%s...' -> '%s...'", text[:50], result[:50])
             
             return result
             
@@ -1064,22 +1355,11 @@ class IntelligentMonitor:
             if len(text.strip()) < 3:
                 return False
             
-            # 过滤只包含特殊字符的文本
-            import re
-            if re.match(r'^[^\w\u4e00-\u9fff]+$', text.strip()):
+            # 过滤只包含特殊字符的文本和明显的噪声文本
+            stripped = text.strip()
+            if any(pattern.match(stripped) for pattern in _INVALID_CONTENT_RES):
                 return False
             
-            # 过滤明显的噪声文本
-            noise_patterns = [
-                r'^[_\-=+]{3,}$',  # 连续的符号
-                r'^[0-9.]{3,}$',   # 纯数字
-                r'^[A-Z]{1,2}$',   # 单独的字母
-            ]
-            
-            for pattern in noise_patterns:
-                if re.match(pattern, text.strip()):
-                    return False
-            
             return True
             
         except Exception as e:
@@ -1092,34 +1372,23 @@ class IntelligentMonitor:
             lines = full_text.split('\n')
             chat_lines = []
             
-            # 查找可能的聊天内容关键词
-            chat_keywords = [
-                "claude", "cursor", "assistant", "ai", "助手",
-                "代码", "函数", "错误", "实现", "完成", "修复",
-                "测试", "运行", "调试", "配置", "安装"
-            ]
-            
             for line in lines:
-                line_lower = line.lower().strip()
-                if line_lower and len(line.strip()) > 10:  # 忽略太短的行
-                    # 检查是否包含聊天相关内容
-                    if any(keyword in line_lower for keyword in chat_keywords):
-                        chat_lines.append(line.strip())
-                    # 或者包含常见的编程相关内容
-                    elif any(word in line_lower for word in ["error", "function", "class", "import", "def", "return"]):
-                        chat_lines.append(line.strip())
+                stripped = line.strip()
+                # 忽略太短的行；包含聊天相关内容或常见的编程相关内容的行，一次扫描判断
+                if len(stripped) > 10 and _CHAT_LINE_RE.search(stripped.lower()):
+                    chat_lines.append(stripped)
             
             # 如果找到相关内容，返回最后几行（最新的对话）
             if chat_lines:
                 # 返回最后5行最相关的内容
                 relevant_content = "\n".join(chat_lines[-5:])
-                logger.debug(f"智能提取聊天内容: {relevant_content[:100]}...")
+                logger.debug("智能提取聊天内容: %s...", relevant_content[:100])
                 return relevant_content
             
             # 如果没有找到特定内容，返回最后几行作为fallback
             if lines:
                 fallback_content = "\n".join([line.strip() for line in lines[-3:] if line.strip()])
-                logger.debug(f"Fallback内容: {fallback_content[:100]}...")
+                logger.debug("Fallback内容: %s...", fallback_content[:100])
                 return fallback_content
                 
             return ""
@@ -1135,14 +1404,29 @@ class IntelligentMonitor:
             
             # 清理状态历史
             self.state_history.clear()
-            self.content_history.clear()
+            self.content_history.fill(0)
+            self._hist_idx = 0
             self.recent_analysis_results.clear()
             
             # 重置状态
             self.current_state = None
             self.last_content_hash = None
+            self._last_tokens = frozenset()
+            self._last_quick_hash = None
+            self._last_analysis_text = None
             self.region_selected = False
             self.chat_regions.clear()
+            self._region_cache.clear()
+            
+            if self._sct is not None:
+                self._sct.close()
+                self._sct = None
+            if self._camera:
+                self._camera.stop()
+            self._camera = None
+            if self._ocr_pool is not None:
+                self._ocr_pool.shutdown(wait=False)
+                self._ocr_pool = None
             
             logger.info("✅ IntelligentMonitor资源清理完成")
             
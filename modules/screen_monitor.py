@@ -17,12 +17,21 @@ import io
 import base64
 from typing import Optional, Tuple, List
 import subprocess
+import config
 import platform
 
 # 尝试导入OCR引擎
+RAPIDOCR_AVAILABLE = False
 EASYOCR_AVAILABLE = False
 PYTESSERACT_AVAILABLE = False
 
+try:
+    # PP-OCR模型的ONNX Runtime版本（自带中英文模型），CPU推理比EasyOCR的Torch路径快
+    from rapidocr_onnxruntime import RapidOCR
+    RAPIDOCR_AVAILABLE = True
+except ImportError:
+    pass
+
 try:
     import easyocr
     EASYOCR_AVAILABLE = True
@@ -37,6 +46,46 @@ except ImportError:
 
 logger = logging.getLogger(__name__)
 
+# 跨平台查找时按优先级匹配的窗口标题（不区分大小写的子串匹配，与getWindowsWithTitle一致）
+_CURSOR_WINDOW_TITLES = ("Cursor", "Visual Studio Code", "Code")
+
+class OnnxOCRReader:
+    """RapidOCR(ONNX Runtime)适配器，提供与EasyOCR Reader相同的readtext接口"""
+    
+    native_batching = False  # readtext_batched只是逐张循环，调用方无需为批处理填充图像
+    
+    def __init__(self):
+        self.engine = RapidOCR()
+    
+    def readtext(self, image: np.ndarray) -> list:
+        """识别图像文本，返回[(坐标框, 文本, 置信度), ...]"""
+        if image.ndim == 3:
+            image = np.ascontiguousarray(image[..., ::-1])  # RGB -> BGR
+        result, _ = self.engine(image)
+        return [(box, text, float(score)) for box, text, score in (result or [])]
+    
+    def readtext_batched(self, images: List[np.ndarray], **kwargs) -> List[list]:
+        """逐张识别，保持与EasyOCR readtext_batched相同的返回结构"""
+        return [self.readtext(image) for image in images]
+
+def _enable_fp16_recognizer(reader):
+    """只让EasyOCR的识别网络在FP16自动混合精度下运行；检测网络(CRAFT)保持FP32，
+    其得分图要交给OpenCV阈值/连通域处理，不能是float16"""
+    import torch
+    recognizer = reader.recognizer
+    forward = recognizer.forward
+    
+    def fp16_forward(*args, **kwargs):
+        with torch.autocast('cuda', dtype=torch.float16):
+            return forward(*args, **kwargs).float()
+    
+    recognizer.forward = fp16_forward
+
+def _smoke_check_reader(reader):
+    """用空白图跑一遍检测+识别，确认GPU/FP16路径可用，失败时抛出异常"""
+    reader.readtext(np.full((64, 256, 3), 255, dtype=np.uint8))
+    reader.recognize(np.full((32, 128), 255, dtype=np.uint8))
+
 class ScreenMonitor:
     """屏幕监控类"""
     
@@ -65,11 +114,38 @@ class ScreenMonitor:
     
     def _init_ocr(self):
         """初始化OCR引擎"""
-        # 尝试EasyOCR优先
+        # 优先使用ONNX Runtime推理的RapidOCR
+        if RAPIDOCR_AVAILABLE:
+            try:
+                logger.info("🔍 正在初始化RapidOCR(ONNX Runtime)引擎...")
+                self.ocr_reader = OnnxOCRReader()
+                self.use_easyocr = True  # 与EasyOCR共用readtext调用路径
+                
+                # 设置全局OCR引用
+                ScreenMonitor._global_ocr_reader = self.ocr_reader
+                
+                logger.info("✅ RapidOCR引擎初始化成功")
+                return
+            except Exception as e:
+                logger.warning(f"⚠️ RapidOCR初始化失败: {e}")
+        
+        # 其次尝试EasyOCR
         if EASYOCR_AVAILABLE:
             try:
                 logger.info("🔍 正在初始化EasyOCR引擎...")
-                self.ocr_reader = easyocr.Reader(['en', 'ch_sim'], gpu=False)  # 禁用GPU以避免CUDA问题
+                self.ocr_reader = None
+                if config.OCR_USE_GPU and self._cuda_available():
+                    # GPU：启用cuDNN自动选择卷积算法，识别网络使用FP16自动混合精度
+                    try:
+                        reader = easyocr.Reader(['en', 'ch_sim'], gpu=True, quantize=False, cudnn_benchmark=True)
+                        _enable_fp16_recognizer(reader)
+                        _smoke_check_reader(reader)
+                        self.ocr_reader = reader
+                        logger.info("⚡ EasyOCR使用GPU(FP16识别)推理")
+                    except Exception as e:
+                        logger.warning(f"⚠️ EasyOCR GPU自检失败，改用CPU: {e}")
+                if self.ocr_reader is None:
+                    self.ocr_reader = easyocr.Reader(['en', 'ch_sim'], gpu=False)  # 默认禁用GPU以避免CUDA问题
                 self.use_easyocr = True
                 
                 # 设置全局OCR引用
@@ -102,6 +178,15 @@ class ScreenMonitor:
         logger.info("   3. 执行: pip install easyocr")
         logger.info("   4. 或者安装Tesseract: https://github.com/UB-Mannheim/tesseract/wiki")
     
+    @staticmethod
+    def _cuda_available() -> bool:
+        """检查PyTorch是否可以使用CUDA"""
+        try:
+            import torch
+            return torch.cuda.is_available()
+        except Exception:
+            return False
+    
     async def initialize(self):
         """异步初始化方法"""
         try:
@@ -232,14 +317,14 @@ class ScreenMonitor:
     def _find_cursor_window_cross_platform(self) -> Optional[Tuple[int, int, int, int]]:
         """跨平台方式查找CURSOR窗口"""
         try:
-            # 使用pyautogui查找窗口
-            window_titles = ["Cursor", "cursor", "Visual Studio Code", "Code"]
+            # 只枚举一次所有窗口，再按标题优先级匹配
+            all_windows = [(w, w.title.casefold()) for w in pyautogui.getAllWindows() if w.title]
             
-            for title in window_titles:
+            for title in _CURSOR_WINDOW_TITLES:
                 try:
-                    windows = pyautogui.getWindowsWithTitle(title)
-                    if windows:
-                        window = windows[0]
+                    needle = title.casefold()
+                    window = next((w for w, folded in all_windows if needle in folded), None)
+                    if window is not None:
                         # 尝试激活窗口
                         try:
                             window.activate()
@@ -265,7 +350,7 @@ class ScreenMonitor:
     async def extract_text(self, image: Image.Image) -> str:
         """从图像中提取文本 - 优化版本：增强fallback机制"""
         # 如果没有OCR引擎，使用智能图像分析fallback
-        if not EASYOCR_AVAILABLE and not PYTESSERACT_AVAILABLE:
+        if not RAPIDOCR_AVAILABLE and not EASYOCR_AVAILABLE and not PYTESSERACT_AVAILABLE:
             logger.debug("💡 使用智能图像分析代替OCR")
             return await self.intelligent_text_fallback(image)
             
@@ -539,9 +624,14 @@ class ScreenMonitor:
     def get_ocr_status(self) -> dict:
         """获取OCR引擎状态"""
         return {
+            "rapidocr_available": RAPIDOCR_AVAILABLE,
             "easyocr_available": EASYOCR_AVAILABLE,
             "pytesseract_available": PYTESSERACT_AVAILABLE,
-            "current_engine": "EasyOCR" if self.use_easyocr else "Tesseract" if PYTESSERACT_AVAILABLE else "None",
+            "current_engine": (
+                "RapidOCR" if isinstance(self.ocr_reader, OnnxOCRReader)
+                else "EasyOCR" if self.use_easyocr
+                else "Tesseract" if PYTESSERACT_AVAILABLE else "None"
+            ),
             "ocr_reader_initialized": self.ocr_reader is not None
         }
     
@@ -4,6 +4,22 @@ from typing import List, Tuple, Optional, Dict
 from PIL import Image
 import numpy as np
 
+# Prefer orjson for config (de)serialisation; fall back to the stdlib json module
+try:
+    import orjson
+
+    def _loads(raw: bytes):
+        return orjson.loads(raw)
+
+    def _dumps(obj) -> bytes:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS)
+except ImportError:
+    def _loads(raw: bytes):
+        return json.loads(raw)
+
+    def _dumps(obj) -> bytes:
+        return json.dumps(obj, ensure_ascii=False, indent=2).encode("utf-8")
+
 class WindowSelector:
     """Minimal window region selector used by IntelligentMonitor."""
 
@@ -17,15 +33,15 @@ class WindowSelector:
     def _load_config(self) -> Dict:
         if os.path.exists("window_regions.json"):
             try:
-                with open("window_regions.json", "r", encoding="utf-8") as f:
-                    return json.load(f)
+                with open("window_regions.json", "rb") as f:
+                    return _loads(f.read())
             except Exception:
                 return {}
         return {}
 
     def _save_config(self, data: Dict) -> None:
-        with open("window_regions.json", "w", encoding="utf-8") as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
+        with open("window_regions.json", "wb") as f:
+            f.write(_dumps(data))
 
     def select_chat_region(self) -> Optional[List[Tuple[int, int, int, int]]]:
         """Load saved chat regions from configuration."""
@@ -90,13 +106,20 @@ class WindowSelector:
         ocr_reader=None,
     ) -> str:
         """Extract text from the specified region using the available OCR reader."""
+        x, y, w, h = region
+        try:
+            crop = image.crop((x, y, x + w, y + h))
+        except Exception:
+            return ""
+        return self.extract_image_text(crop, ocr_reader)
+
+    def extract_image_text(self, image: Image.Image, ocr_reader=None) -> str:
+        """Extract text from an already-cropped region image."""
         reader = ocr_reader or self.ocr_reader
         if reader is None:
             return ""
-        x, y, w, h = region
         try:
-            crop = image.crop((x, y, x + w, y + h))
-            result = reader.readtext(np.array(crop))
+            result = reader.readtext(np.array(image))
             return " ".join(r[1] for r in result)
         except Exception:
             return ""